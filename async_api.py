@@ -0,0 +1,256 @@
+"""
+Async facade over main.py for asyncio callers.
+Every call is queued on a dedicated database thread through a bounded queue, so the event
+loop never blocks on SQLite. Writes waiting in the queue together are committed as one
+group, in one transaction, and each call's result is returned once its group is committed.
+"""
+
+# pylint: disable=W0718
+import asyncio
+import concurrent.futures
+import queue
+import threading
+import main
+
+# Calls waiting for the database thread; callers wait for room once the queue is full
+QUEUE_SIZE = 1024
+# Most writes committed together in one transaction
+MAX_GROUP = 256
+
+EXECUTOR = {"current": None}
+EXECUTOR_LOCK = threading.Lock()
+
+
+def create_executor(maxsize=QUEUE_SIZE, max_group=MAX_GROUP):
+    """
+    Starts a database thread fed by a bounded queue and returns the executor
+    """
+    executor = {
+        "queue": queue.Queue(maxsize),
+        "max_group": max_group,
+        "add_status": main.create_add_status_function(),
+        # Guards the counters, which submit updates from the callers' threads and the
+        # database thread updates as calls complete
+        "lock": threading.Lock(),
+        "submitted": 0,
+        "completed": 0,
+        "groups": 0,
+        "grouped_writes": 0,
+        "max_depth": 0,
+    }
+    executor["thread"] = threading.Thread(
+        target=run_executor, args=(executor,), name="db-executor", daemon=True
+    )
+    executor["thread"].start()
+    return executor
+
+
+def shutdown_executor(executor):
+    """
+    Finishes every queued call, then stops the database thread
+    """
+    executor["queue"].put(None)
+    executor["thread"].join()
+
+
+def get_executor():
+    """
+    Returns the shared executor, starting it on first use
+    """
+    with EXECUTOR_LOCK:
+        executor = EXECUTOR["current"]
+        if executor is None:
+            executor = EXECUTOR["current"] = create_executor()
+        return executor
+
+
+def close_executor():
+    """
+    Stops the shared executor, if it was started
+    """
+    with EXECUTOR_LOCK:
+        executor, EXECUTOR["current"] = EXECUTOR["current"], None
+    if executor is not None:
+        shutdown_executor(executor)
+
+
+def queue_stats(executor=None):
+    """
+    Returns the current and highest queue depth and the call and group commit counters
+    """
+    executor = executor or get_executor()
+    with executor["lock"]:
+        return {
+            "depth": executor["queue"].qsize(),
+            "maxsize": executor["queue"].maxsize,
+            "max_depth": executor["max_depth"],
+            "submitted": executor["submitted"],
+            "completed": executor["completed"],
+            "groups": executor["groups"],
+            "grouped_writes": executor["grouped_writes"],
+        }
+
+
+def run_executor(executor):
+    """
+    Database thread: runs queued calls in order. A write and the writes queued right behind it
+    run in one transaction, each in its own savepoint, and their futures resolve after the commit.
+    """
+    calls = executor["queue"]
+    pending = None
+    stop = False
+    try:
+        while not stop:
+            call = pending or calls.get()
+            pending = None
+            if call is None:
+                return
+            if not call[3]:
+                run_call(executor, call)
+                continue
+            group = [call]
+            while len(group) < executor["max_group"]:
+                try:
+                    call = calls.get_nowait()
+                except queue.Empty:
+                    break
+                if call is not None and call[3]:
+                    group.append(call)
+                    continue
+                # A read, or the stop marker, waits for the group ahead of it
+                pending, stop = call, call is None
+                break
+            run_group(executor, group)
+    finally:
+        main.db.close()
+
+
+def run_call(executor, call):
+    """
+    Runs one read call and resolves its future
+    """
+    func, args, future, _ = call
+    running = future.set_running_or_notify_cancel()
+    result, error = None, None
+    if running:
+        try:
+            result = func(*args)
+        except Exception as e:
+            error = e
+    # Counted before the future resolves, as in run_group
+    with executor["lock"]:
+        executor["completed"] += 1
+    if not running:
+        return
+    if error is None:
+        future.set_result(result)
+    else:
+        future.set_exception(error)
+
+
+def run_group(executor, group):
+    """
+    Runs a group of write calls in one transaction and resolves their futures once committed
+    """
+    results = []
+    try:
+        with main.db.transaction():
+            for func, args, future, _ in group:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with main.db.transaction():
+                        results.append((future, func(*args), None))
+                except Exception as e:
+                    results.append((future, None, e))
+    except Exception as e:
+        results = [(future, None, e) for future, _, _ in results]
+    # Counted before any future resolves, so a caller that was waiting sees its call counted
+    with executor["lock"]:
+        executor["groups"] += 1
+        executor["grouped_writes"] += len(group)
+        executor["completed"] += len(group)
+    for future, result, error in results:
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+
+async def submit(func, *args, write=False, executor=None):
+    """
+    Queues func(*args) on the database thread and returns its result.
+    Waits without blocking the event loop while the queue is full.
+    """
+    executor = executor or get_executor()
+    future = concurrent.futures.Future()
+    call = (func, args, future, write)
+    try:
+        executor["queue"].put_nowait(call)
+    except queue.Full:
+        await asyncio.to_thread(executor["queue"].put, call)
+    with executor["lock"]:
+        executor["submitted"] += 1
+        executor["max_depth"] = max(executor["max_depth"], executor["queue"].qsize())
+    return await asyncio.wrap_future(future)
+
+
+async def add_user(user_data):
+    """
+    Adds a new user, see main.add_user
+    """
+    return await submit(main.add_user, user_data, write=True)
+
+
+async def update_user(user_id, email, user_name, user_last_name):
+    """
+    Updates a user, see main.update_user
+    """
+    return await submit(
+        lambda *args: main.update_user(main.db, *args),
+        user_id, email, user_name, user_last_name, write=True,
+    )
+
+
+async def delete_user(user_id):
+    """
+    Deletes a user and their statuses, see main.delete_user
+    """
+    return await submit(main.delete_user, user_id, write=True)
+
+
+async def search_user(user_id):
+    """
+    Returns a user's data, or None if not found, see main.search_user
+    """
+    return await submit(main.search_user(), user_id)
+
+
+async def add_status(status_id, user_id, status_text):
+    """
+    Adds a status for an existing user, see main.create_add_status_function
+    """
+    executor = get_executor()
+    return await submit(executor["add_status"], status_id, user_id, status_text,
+                        write=True, executor=executor)
+
+
+async def update_status(status_id, user_id, status_text):
+    """
+    Updates a status, see main.update_status
+    """
+    return await submit(main.update_status, status_id, user_id, status_text, write=True)
+
+
+async def delete_status(status_id):
+    """
+    Deletes a status, see main.delete_status
+    """
+    return await submit(main.delete_status, status_id, write=True)
+
+
+async def search_status(status_id):
+    """
+    Returns a status's data, or None if not found, see main.search_status
+    """
+    return await submit(main.search_status, status_id)
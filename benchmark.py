@@ -0,0 +1,294 @@
+"""
+Benchmarks the CRUD and load paths of main.py against a real SQLite file
+
+Usage:
+    python benchmark.py --scales 10000 100000 1000000 --output results.json
+    python benchmark.py --scales 10000 --compare results.json
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from peewee import chunked
+import loaders
+import main
+import socialnetwork_model
+import status_queue
+import streaming
+
+DEFAULT_SCALES = [10000, 100000, 1000000]
+# Single-row operations timed per scale
+DEFAULT_OPERATIONS = 1000
+DEFAULT_OUTPUT = "benchmark_results.json"
+
+
+def generated_user(number, count, seed=0):
+    """
+    Returns the user_id, name, last name and email of user number out of count, as written by
+    generate_users, so generated statuses can refer to users that exist
+    """
+    name = f"Name{(number * 2654435761 + seed) % count}"
+    return f"{name}.Last{number}", name, f"Last{number}", f"{name}.{number}@goodmail.com"
+
+
+def generate_users(filename, count, seed=0):
+    """
+    Writes count synthetic users in the shape of accounts.csv
+    """
+    with open(filename, "w", encoding="utf-8", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["USER_ID", "NAME", "LASTNAME", "EMAIL"])
+        for number in range(count):
+            writer.writerow(generated_user(number, count, seed))
+
+
+def generate_statuses(filename, count, user_count, seed=0):
+    """
+    Writes count synthetic status updates for random users generated by generate_users
+    with the same user_count and seed
+    """
+    users = random.Random(seed)
+    with open(filename, "w", encoding="utf-8", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["STATUS_ID", "USER_ID", "STATUS_TEXT"])
+        for number in range(count):
+            user_id = generated_user(users.randrange(user_count), user_count, seed)[0]
+            writer.writerow([f"status{number}", user_id, f"Status text number {number}"])
+
+
+def read_user_ids(filename):
+    """
+    Returns the user_ids of a generated user file
+    """
+    with open(filename, encoding="utf-8", newline="") as csvfile:
+        return [row["USER_ID"] for row in csv.DictReader(csvfile)]
+
+
+def use_database(filename):
+    """
+    Points main at a fresh database file and returns it
+    """
+    main.db = main.init_database(filename)
+    return main.db
+
+
+def timed(scale, operation, count, func, trace_memory=False):
+    """
+    Runs func with its output discarded and returns a result record for it.
+    With trace_memory the peak Python allocation during the run is recorded too.
+    """
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+        if trace_memory:
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    result = {
+        "scale": scale,
+        "operation": operation,
+        "count": count,
+        "seconds": round(seconds, 6),
+        "per_second": round(count / seconds, 1) if seconds else None,
+    }
+    if trace_memory:
+        result["peak_bytes"] = peak_bytes
+    return result
+
+
+def decode_dicts(filename):
+    """
+    Decodes a generated user file into one dict per row, as csv.DictReader does
+    """
+    with open(filename, encoding="utf-8", newline="") as csvfile:
+        return list(main.user_rows(csv.DictReader(csvfile)))
+
+
+def decode_tuples(filename):
+    """
+    Decodes a generated user file into one tuple per row, as bulk_load_users does
+    """
+    with open(filename, encoding="utf-8", newline="") as csvfile:
+        return list(loaders.csv_tuples(csv.reader(csvfile), main.USER_FIELDS))
+
+
+def post_statuses(user_ids):
+    """
+    Posts one status per user through a group-commit status queue and waits for all of them
+    """
+    statuses = status_queue.create_status_queue()
+    futures = [status_queue.post_status(statuses, f"posted{number}", user_id, "posted")
+               for number, user_id in enumerate(user_ids)]
+    status_queue.close_status_queue(statuses)
+    return [future.result() for future in futures]
+
+
+def run_scale(scale, directory, operations=DEFAULT_OPERATIONS, seed=0):
+    """
+    Benchmarks every load and CRUD path at one scale and returns the result records
+    """
+    users_file = os.path.join(directory, f"users_{scale}.csv")
+    statuses_file = os.path.join(directory, f"statuses_{scale}.csv")
+    generate_users(users_file, scale, seed)
+    generate_statuses(statuses_file, scale, scale, seed)
+    user_ids = read_user_ids(users_file)
+    sample = random.Random(seed).sample(user_ids, min(operations, scale))
+    results = time_loaders(scale, directory, (users_file, statuses_file), user_ids)
+    results.extend(time_operations(scale, user_ids, sample))
+    return results
+
+
+def time_loaders(scale, directory, files, user_ids):
+    """
+    Times decoding and loading the generated (users, statuses) files; leaves main on the
+    database of the batched loaders
+    """
+    users_file, statuses_file = files
+    # Row decoding alone, holding every decoded row to compare their memory footprint
+    results = [
+        timed(scale, "decode_dicts", scale, lambda: decode_dicts(users_file), True),
+        timed(scale, "decode_tuples", scale, lambda: decode_tuples(users_file), True),
+    ]
+
+    # Row-by-row loaders
+    use_database(os.path.join(directory, f"rows_{scale}.db"))
+    results.append(timed(scale, "load_users", scale, lambda: main.load_users(users_file)))
+    results.append(timed(scale, "load_status_updates", scale,
+                         lambda: main.load_status_updates(statuses_file)))
+
+    # Batched loaders, whose database is reused for the single-row operations
+    use_database(os.path.join(directory, f"batched_{scale}.db"))
+    results.append(timed(scale, "bulk_load_users", scale, lambda: main.bulk_load_users(users_file)))
+    results.append(timed(scale, "stream_status_updates", scale,
+                         lambda: streaming.stream_status_updates(statuses_file,
+                                                                 user_ids=set(user_ids))))
+    return results
+
+
+def time_operations(scale, user_ids, sample):
+    """
+    Times the single-row operations on the sampled users of a loaded database, then the
+    cleanup of as many orphaned statuses
+    """
+    new_users = [
+        {"user_id": f"new{number}", "user_email": f"new{number}@uw.edu",
+         "user_name": "New", "user_last_name": "User"}
+        for number in range(len(sample))
+    ]
+    search = main.search_user()
+    add_status = main.create_add_status_function()
+    statuses = [(f"status{number}", user_ids[number]) for number in range(len(sample))]
+    results = [
+        timed(scale, "add_user", len(new_users),
+              lambda: [main.add_user(user) for user in new_users]),
+        timed(scale, "search_user", len(sample),
+              lambda: [search(user_id) for user_id in sample]),
+        timed(scale, "add_status", len(sample),
+              lambda: [add_status(f"added{number}", user_id, "added")
+                       for number, user_id in enumerate(sample)]),
+        timed(scale, "post_status", len(sample), lambda: post_statuses(sample)),
+        timed(scale, "update_status", len(statuses),
+              lambda: [main.update_status(status_id, user_id, "updated")
+                       for status_id, user_id in statuses]),
+        timed(scale, "delete_user", len(sample),
+              lambda: [main.delete_user(user_id) for user_id in sample]),
+    ]
+
+    # Orphan a slice of statuses by removing users directly, then clean them up
+    orphaned = user_ids[-len(sample):]
+    users = main.db[main.USER_TABLE].model_class
+    for ids_chunk in chunked(orphaned, loaders.ROWS_PER_INSERT):
+        users.delete().where(users.user_id.in_(ids_chunk)).execute()
+    results.append(timed(scale, "delete_status_without_user", len(orphaned),
+                         main.delete_status_without_user))
+    return results
+
+
+def git_commit():
+    """
+    Returns the current git commit, or None outside a git checkout
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(scales, operations=DEFAULT_OPERATIONS, seed=0):
+    """
+    Runs the benchmark at every scale in a temporary directory and returns the full report
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in scales:
+            results.extend(run_scale(scale, directory, operations, seed))
+            for database in list(socialnetwork_model.DATASETS):
+                if database.startswith(directory):
+                    socialnetwork_model.close_ds(database)
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "results": results,
+    }
+
+
+def compare(report, baseline):
+    """
+    Returns, for every result also present in baseline, the ratio of new to old time
+    (above 1 means slower)
+    """
+    old = {(result["scale"], result["operation"]): result for result in baseline["results"]}
+    return [
+        {
+            "scale": result["scale"],
+            "operation": result["operation"],
+            "ratio": (round(result["seconds"] / old[key]["seconds"], 3)
+                      if old[key]["seconds"] else None),
+        }
+        for result in report["results"]
+        if (key := (result["scale"], result["operation"])) in old
+    ]
+
+
+def main_benchmark(argv=None):
+    """
+    Command line entry point
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    parser.add_argument("--operations", type=int, default=DEFAULT_OPERATIONS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.scales, args.operations, args.seed)
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(report, output, indent=2)
+    for result in report["results"]:
+        print(f"{result['scale']:>8} {result['operation']:<28} {result['seconds']:>10.3f}s "
+              f"{result['per_second'] or 0:>12.1f}/s")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            for row in compare(report, json.load(baseline_file)):
+                print(f"{row['scale']:>8} {row['operation']:<28} x{row['ratio']}")
+    return report
+
+
+if __name__ == "__main__":
+    main_benchmark(sys.argv[1:])
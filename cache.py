@@ -0,0 +1,66 @@
+"""
+Bounded LRU cache used to serve repeated database lookups from memory
+"""
+
+from collections import OrderedDict
+
+
+def create_cache(maxsize):
+    """
+    Creates and returns an empty cache holding at most maxsize entries
+    """
+    return {"entries": OrderedDict(), "maxsize": maxsize, "hits": 0, "misses": 0}
+
+
+def cache_lookup(cache, key, loader):
+    """
+    Returns the cached value for key, calling loader(key) on a miss.
+    None results are not cached, so rows added later are still found.
+    """
+    entries = cache["entries"]
+    if key in entries:
+        cache["hits"] += 1
+        entries.move_to_end(key)
+        return entries[key]
+    cache["misses"] += 1
+    value = loader(key)
+    if value is not None:
+        entries[key] = value
+        if len(entries) > cache["maxsize"]:
+            entries.popitem(last=False)
+    return value
+
+
+def cache_invalidate(cache, key):
+    """
+    Drops key from the cache, if it is there
+    """
+    cache["entries"].pop(key, None)
+
+
+def cache_invalidate_where(cache, predicate):
+    """
+    Drops every cached value for which predicate(value) is true
+    """
+    entries = cache["entries"]
+    for key in [key for key, value in entries.items() if predicate(value)]:
+        del entries[key]
+
+
+def cache_values(cache):
+    """
+    Returns the cached values, least recently used first
+    """
+    return list(cache["entries"].values())
+
+
+def cache_stats(cache):
+    """
+    Returns the size and hit/miss counters of the cache
+    """
+    return {
+        "size": len(cache["entries"]),
+        "maxsize": cache["maxsize"],
+        "hits": cache["hits"],
+        "misses": cache["misses"],
+    }
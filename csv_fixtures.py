@@ -0,0 +1,14 @@
+"""
+CSV file helpers shared by the loader unittests
+"""
+
+import tempfile
+
+
+def write_csv(text):
+    """
+    write text to a temporary CSV file and return its path
+    """
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8") as csvfile:
+        csvfile.write(text)
+    return csvfile.name
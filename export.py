@@ -0,0 +1,275 @@
+"""
+Streams users and statuses out of the database to CSV, JSON Lines or columnar files
+
+Usage:
+    python export.py --output-dir exports --format csv --gzip
+    python export.py --tables statuses --format jsonl --database databaseA08.db
+    python export.py --output-dir exports --format columnar
+
+Columnar exports are Parquet when pyarrow is installed. Otherwise they use the .colz format,
+a ZIP archive (deflate-compressed) that needs only the standard library to read:
+    manifest.json       {"format": "socialnetwork-columns", "version": 1, "table": ...,
+                         "columns": [header, ...], "rows": total,
+                         "row_groups": [{"rows": n}, ...]}
+    <group>/<column>.offsets
+                        little-endian int64 end offset of every value in the data file
+    <group>/<column>.data
+                        the group's values of that column, UTF-8 encoded back to back
+Row groups hold up to ROW_GROUP_SIZE rows and are numbered from 0.
+"""
+
+# pylint: disable=E0401
+import argparse
+import csv
+import gzip
+import itertools
+import json
+import os
+import sys
+import time
+import zipfile
+from array import array
+from peewee import chunked
+import main
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Rows fetched from the cursor at a time; memory use does not depend on the table size
+FETCH_SIZE = 10000
+# Rows per row group of a columnar export
+ROW_GROUP_SIZE = 100000
+TEXT_FORMATS = ("csv", "jsonl")
+COLUMNAR_FORMATS = ("parquet", "colz")
+FORMATS = TEXT_FORMATS + COLUMNAR_FORMATS
+COLUMNS_FORMAT = "socialnetwork-columns"
+COLUMNS_VERSION = 1
+# Exported tables, with the CSV headers of their loaders mapped to columns
+EXPORTS = {
+    "users": (main.USER_TABLE, main.USER_FIELDS),
+    "statuses": (main.STATUS_TABLE, main.STATUS_FIELDS),
+}
+
+
+def export_format(filename):
+    """
+    Returns the format named by a file's extension, ignoring a trailing .gz
+    """
+    name = filename[:-3] if filename.endswith(".gz") else filename
+    extension = os.path.splitext(name)[1].lstrip(".")
+    if extension not in (FORMATS if name == filename else TEXT_FORMATS):
+        raise ValueError(f"Cannot tell the export format of {filename}")
+    return extension
+
+
+def columnar_format():
+    """
+    Returns the columnar format available here: parquet with pyarrow, else colz
+    """
+    return "parquet" if pyarrow is not None else "colz"
+
+
+def open_output(filename):
+    """
+    Opens a file for writing text, gzip-compressed if its name ends in .gz
+    """
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "wt", encoding="utf-8", newline="")
+    return open(filename, "w", encoding="utf-8", newline="")
+
+
+def stream_rows(table_name, columns, fetch_size=FETCH_SIZE):
+    """
+    Generator of the rows of a table as tuples of columns, in id order, read from one cursor
+    fetch_size rows at a time
+    """
+    main.ensure_columns(table_name, main.TABLE_COLUMNS[table_name])
+    selected = ", ".join(f'"{column}"' for column in columns)
+    cursor = main.db.query(f'SELECT {selected} FROM "{table_name}" ORDER BY id')
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def write_csv(output, header, rows):
+    """
+    Writes rows as CSV under header and returns the number written
+    """
+    writer = csv.writer(output)
+    writer.writerow(header)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_jsonl(output, header, rows):
+    """
+    Writes rows as one JSON object per line, keyed by header, and returns the number written
+    """
+    count = 0
+    for row in rows:
+        output.write(json.dumps(dict(zip(header, row))) + "\n")
+        count += 1
+    return count
+
+
+def write_parquet(filename, header, rows, row_group_size=ROW_GROUP_SIZE):
+    """
+    Writes rows to a Parquet file, one row group per row_group_size rows, and returns the
+    number written. Needs pyarrow.
+    """
+    if pyarrow is None:
+        raise ImportError("Parquet export needs pyarrow; use the colz format instead")
+    schema = pyarrow.schema([(column, pyarrow.string()) for column in header])
+    count = 0
+    with pyarrow.parquet.ParquetWriter(filename, schema) as writer:
+        for chunk in chunked(rows, row_group_size):
+            columns = [list(values) for values in zip(*chunk)]
+            writer.write_table(pyarrow.table(dict(zip(header, columns)), schema=schema))
+            count += len(chunk)
+    return count
+
+
+def write_colz(filename, header, rows, row_group_size=ROW_GROUP_SIZE):
+    """
+    Writes rows to a .colz archive (see the module docstring), one row group per
+    row_group_size rows, and returns the number written
+    """
+    row_groups = []
+    with zipfile.ZipFile(filename, "w", zipfile.ZIP_DEFLATED) as archive:
+        for group, chunk in enumerate(chunked(rows, row_group_size)):
+            for column, values in zip(header, zip(*chunk)):
+                data = [("" if value is None else str(value)).encode("utf-8") for value in values]
+                offsets = array("q", itertools.accumulate(map(len, data)))
+                if sys.byteorder == "big":
+                    offsets.byteswap()
+                archive.writestr(f"{group}/{column}.offsets", offsets.tobytes())
+                archive.writestr(f"{group}/{column}.data", b"".join(data))
+            row_groups.append({"rows": len(chunk)})
+        count = sum(row_group["rows"] for row_group in row_groups)
+        archive.writestr("manifest.json", json.dumps({
+            "format": COLUMNS_FORMAT,
+            "version": COLUMNS_VERSION,
+            "table": os.path.basename(filename).split(".")[0],
+            "columns": list(header),
+            "rows": count,
+            "row_groups": row_groups,
+        }))
+    return count
+
+
+def read_colz(filename, columns=None):
+    """
+    Generator of the row groups of a .colz archive, each a dict mapping every column,
+    or only the given columns, to the list of its values
+    """
+    with zipfile.ZipFile(filename) as archive:
+        manifest = json.loads(archive.read("manifest.json"))
+        if manifest.get("format") != COLUMNS_FORMAT or manifest.get("version") != COLUMNS_VERSION:
+            raise ValueError(
+                f"{filename} is not a version {COLUMNS_VERSION} {COLUMNS_FORMAT} archive"
+            )
+        for group in range(len(manifest["row_groups"])):
+            yield {
+                column: decode_column(archive.read(f"{group}/{column}.offsets"),
+                                      archive.read(f"{group}/{column}.data"))
+                for column in columns or manifest["columns"]
+            }
+
+
+def decode_column(offsets_bytes, data):
+    """
+    Returns the values of one column of a row group from its offsets and data files
+    """
+    offsets = array("q")
+    offsets.frombytes(offsets_bytes)
+    if sys.byteorder == "big":
+        offsets.byteswap()
+    starts = itertools.chain([0], offsets)
+    return [data[start:end].decode("utf-8") for start, end in zip(starts, offsets)]
+
+
+COLUMNAR_WRITERS = {"parquet": write_parquet, "colz": write_colz}
+
+
+def export_table(name, filename, fetch_size=FETCH_SIZE, row_group_size=ROW_GROUP_SIZE):
+    """
+    Streams the users or statuses table to filename, in the format of its extension:
+    .csv or .jsonl, optionally followed by .gz, or the columnar .parquet or .colz.
+    Files use the loaders' CSV headers, so a CSV export loads back with
+    load_users/load_status_updates and the bulk loaders.
+    Returns the row count, file size and throughput.
+    """
+    table_name, fields = EXPORTS[name]
+    fmt = export_format(filename)
+    rows = stream_rows(table_name, list(fields.values()), fetch_size)
+    start = time.perf_counter()
+    if fmt in COLUMNAR_WRITERS:
+        count = COLUMNAR_WRITERS[fmt](filename, list(fields), rows, row_group_size)
+    else:
+        write = write_csv if fmt == "csv" else write_jsonl
+        with open_output(filename) as output:
+            count = write(output, list(fields), rows)
+    seconds = time.perf_counter() - start
+    return {
+        "table": name,
+        "filename": filename,
+        "rows": count,
+        "bytes": os.path.getsize(filename),
+        "seconds": round(seconds, 6),
+        "rows_per_second": round(count / seconds, 1) if seconds else None,
+    }
+
+
+def export_database(directory, names=tuple(EXPORTS), fmt="csv", compress=False,
+                    fetch_size=FETCH_SIZE):
+    """
+    Exports tables to <directory>/<name>.<fmt>[.gz] from one read transaction, so every file
+    reflects the same snapshot of the database. fmt "columnar" picks parquet or colz, see
+    columnar_format; columnar files are compressed by their format, so compress only
+    applies to text formats. Returns the summary of every table.
+    """
+    os.makedirs(directory, exist_ok=True)
+    if fmt == "columnar":
+        fmt = columnar_format()
+    suffix = f".{fmt}.gz" if compress and fmt in TEXT_FORMATS else f".{fmt}"
+    with main.db.transaction():
+        return [
+            export_table(name, os.path.join(directory, name + suffix), fetch_size)
+            for name in names
+        ]
+
+
+def main_export(argv=None):
+    """
+    Command line entry point
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", default=main.DATABASE)
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--tables", nargs="+", choices=list(EXPORTS), default=list(EXPORTS))
+    parser.add_argument("--format", choices=FORMATS + ("columnar",), default="csv")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--fetch-size", type=int, default=FETCH_SIZE)
+    args = parser.parse_args(argv)
+
+    main.db = main.init_database(args.database)
+    summaries = export_database(
+        args.output_dir, args.tables, args.format, args.gzip, args.fetch_size
+    )
+    for summary in summaries:
+        print(f"{summary['table']:<10} {summary['rows']:>10} rows in {summary['seconds']:.3f}s "
+              f"({summary['rows_per_second'] or 0:.0f} rows/s), {summary['bytes']} bytes "
+              f"-> {summary['filename']}")
+    return summaries
+
+
+if __name__ == "__main__":
+    main_export(sys.argv[1:])
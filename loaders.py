@@ -0,0 +1,151 @@
+"""
+Batched reading and writing of CSV rows: decoding rows as tuples, splitting out duplicate
+keys and writing multi-row inserts and upserts
+"""
+
+import csv
+from peewee import IntegrityError, chunked
+
+# SQLite limits the number of bound parameters per statement, so multi-row
+# inserts and IN (...) lists are split into sub-chunks of this many rows.
+ROWS_PER_INSERT = 500
+
+
+def find_existing(table, column, values):
+    """
+    Returns the subset of values already stored in the given column, using one query per sub-chunk.
+    """
+    field = getattr(table.model_class, column)
+    existing = set()
+    for values_chunk in chunked(values, ROWS_PER_INSERT):
+        query = table.model_class.select(field).where(field.in_(values_chunk)).tuples()
+        existing.update(value for (value,) in query)
+    return existing
+
+
+def split_duplicates(table, rows, column, key=None):
+    """
+    Splits a batch of rows into rows that can be inserted and rows whose key is already
+    in the database or repeated earlier in the batch. Rows are dicts, or tuples with the
+    column at position key.
+    """
+    key = column if key is None else key
+    existing = find_existing(table, column, [row[key] for row in rows])
+    new_rows = []
+    duplicates = []
+    for row in rows:
+        if row[key] in existing:
+            duplicates.append(row)
+        else:
+            existing.add(row[key])
+            new_rows.append(row)
+    return new_rows, duplicates
+
+
+def insert_batch(table, rows, columns=None):
+    """
+    Inserts a batch of rows with multi-row inserts inside a single transaction.
+    Rows are dicts, or tuples holding the given columns in order.
+    If the batch still hits an IntegrityError it is retried row by row, so only the
+    offending rows are rejected. Returns the rows that could not be inserted.
+    """
+    fields = columns and [getattr(table.model_class, column) for column in columns]
+    try:
+        with table.dataset.transaction():
+            for rows_chunk in chunked(rows, ROWS_PER_INSERT):
+                table.model_class.insert_many(rows_chunk, fields=fields).execute()
+        return []
+    except IntegrityError:
+        failed = []
+        with table.dataset.transaction():
+            for row in rows:
+                try:
+                    with table.dataset.transaction():
+                        table.model_class.insert_many([row], fields=fields).execute()
+                except IntegrityError:
+                    failed.append(row)
+        return failed
+
+
+def upsert_batch(table, rows, key):
+    """
+    Writes a batch with INSERT ... ON CONFLICT DO UPDATE on the unique key column, skipping
+    rows identical to the stored ones. A key repeated within the batch keeps its last row.
+    Returns the number of rows (inserted, updated, unchanged).
+    """
+    model = table.model_class
+    latest = {row[key]: row for row in rows}
+    if not latest:
+        return 0, 0, 0
+    fields = [getattr(model, column) for column in next(iter(latest.values()))]
+    stored = {}
+    for keys_chunk in chunked(list(latest), ROWS_PER_INSERT):
+        query = model.select(*fields).where(getattr(model, key).in_(keys_chunk)).dicts()
+        stored.update((row[key], row) for row in query)
+    new_rows = [row for row_key, row in latest.items() if row_key not in stored]
+    changed = [row for row_key, row in latest.items()
+               if row_key in stored and stored[row_key] != row]
+    with table.dataset.transaction():
+        write_upserts(model, new_rows + changed, key)
+    return len(new_rows), len(changed), len(latest) - len(new_rows) - len(changed)
+
+
+def write_upserts(model, rows, key):
+    """
+    Writes rows with multi-row INSERT ... ON CONFLICT DO UPDATE on the unique key column.
+    """
+    for rows_chunk in chunked(rows, ROWS_PER_INSERT):
+        fields = [getattr(model, column) for column in rows_chunk[0] if column != key]
+        model.insert_many(rows_chunk).on_conflict(
+            conflict_target=[getattr(model, key)], preserve=fields
+        ).execute()
+
+
+def csv_tuples(reader, fields):
+    """
+    Generator of tuples holding the fields' values, in order, for every row of a csv.reader.
+    Short rows are padded with empty values and blank lines skipped; validating the values is
+    left to the caller. Header positions are looked up once; a missing column raises KeyError.
+    """
+    header = next(reader, [])
+    try:
+        positions = [header.index(key) for key in fields]
+    except ValueError as e:
+        raise KeyError(str(e)) from e
+    width = max(positions) + 1
+    for values in reader:
+        if len(values) < width:
+            if not values:
+                continue
+            values += [""] * (width - len(values))
+        yield tuple(values[position] for position in positions)
+
+
+def read_csv_rows(filename, offset=0, fields=None):
+    """
+    Generator that streams a CSV file as (row, end_offset) pairs, where end_offset is the byte
+    offset just past the row. Reading starts at offset so a load can resume mid-file.
+    Rows are dicts keyed by header, or, if fields is given, tuples of those fields' values.
+    """
+    with open(filename, "rb") as csvfile:
+        header = next(csv.reader([csvfile.readline().decode("utf-8")]), None)
+        if header is None:
+            return
+        if offset:
+            csvfile.seek(offset)
+        position = csvfile.tell()
+
+        def lines():
+            nonlocal position
+            for line in iter(csvfile.readline, b""):
+                position += len(line)
+                yield line.decode("utf-8")
+
+        if fields is None:
+            for values in csv.reader(lines()):
+                yield dict(zip(header, values)), position
+            return
+        positions = [header.index(key) if key in header else len(header) for key in fields]
+        for values in csv.reader(lines()):
+            values.append("")
+            yield tuple(values[min(position, len(values) - 1)] for position in positions), position
@@ -2,42 +2,284 @@
 Main driver for a simple social network project using a functional approach
 """
 
+import collections
 import csv
-from peewee import IntegrityError
-from socialnetwork_model import get_ds
+import itertools
+import re
+import string
+import time
+import weakref
+from peewee import SQL, IntegrityError, Tuple, chunked, fn
+from loaders import (
+    ROWS_PER_INSERT, csv_tuples, find_existing, insert_batch, split_duplicates, upsert_batch,
+)
+from rejections import reject, rejection_report, report_summary
+from cache import (
+    cache_invalidate, cache_invalidate_where, cache_lookup, cache_stats, cache_values, create_cache
+)
+from socialnetwork_model import DATABASE, get_ds
+import user_status
 
 db = get_ds()
 USER_TABLE = "UserModel"
 STATUS_TABLE = "StatusModel"
+BATCH_SIZE = 10000
+
+# CSV header -> database column
+USER_FIELDS = {
+    "USER_ID": "user_id",
+    "EMAIL": "user_email",
+    "NAME": "user_name",
+    "LASTNAME": "user_last_name",
+}
+# Maximum number of characters per user column
+USER_LENGTH_LIMITS = {"user_id": 30, "user_name": 30, "user_last_name": 100}
+# One "@" with a dotted domain and no whitespace; deliberately loose, like the sample data
+EMAIL_PATTERN = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+STATUS_FIELDS = {
+    "STATUS_ID": "status_id",
+    "USER_ID": "user_id",
+    "STATUS_TEXT": "status_text",
+}
+FINGERPRINT_TABLE = "UserFingerprint"
+# Columns of every managed table, mapped to a sample value that decides the column type
+TABLE_COLUMNS = {
+    USER_TABLE: dict.fromkeys(USER_FIELDS.values(), ""),
+    STATUS_TABLE: dict.fromkeys(STATUS_FIELDS.values(), ""),
+    FINGERPRINT_TABLE: {"user_id": "", "fingerprint": ""},
+}
+# Indexes init_database keeps in place, as (columns, unique) per table
+INDEXES = {
+    USER_TABLE: [
+        (["user_id"], True),
+        # Prefix searches scan these in order, case-insensitively, with user_id breaking ties
+        # for the cursor
+        (["user_name COLLATE NOCASE", "user_id"], False),
+        (["user_last_name COLLATE NOCASE", "user_id"], False),
+        (["user_email COLLATE NOCASE", "user_id"], False),
+    ],
+    # (user_id, status_id) serves user_id lookups and keyset pages of a user's statuses
+    STATUS_TABLE: [(["status_id"], True), (["user_id", "status_id"], False)],
+    FINGERPRINT_TABLE: [(["user_id"], True)],
+}
+PREFIX_SEARCH_FIELDS = ("user_name", "user_last_name", "user_email")
+PREFIX_SEARCH_PAGE_SIZE = 20
+# SQLite's NOCASE collation folds ASCII letters only
+NOCASE_FOLD = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+STATUS_PAGE_SIZE = 20
+# FTS5 index over status_text, kept in sync with STATUS_TABLE by triggers
+STATUS_SEARCH_TABLE = "StatusSearch"
+# Read-through caches for search_user and search_status; None until enable_cache is called
+CACHES = {"user": None, "status": None}
+VERIFIED_USERS_MAXSIZE = 10000
+# Verified-user caches of live add_status functions, so delete_user can invalidate them
+VERIFIED_USERS = weakref.WeakValueDictionary()
+VERIFIED_USERS_IDS = itertools.count()
 
 # pylint: disable= C0301, W0621, W0718
 
-def init_database():
+def init_database(database=DATABASE):
     """
-    Creates and returns a new instance of a database
+    Returns the shared database instance with its columns and declared indexes in place.
+    Missing indexes are created and existing ones are left alone, so it is safe to call
+    repeatedly.
     """
-    db = get_ds()
+    db = get_ds(database)
+    ensure_indexes(db)
+    ensure_status_search(db)
+    return db
+
 
-    # Ensure the user_id column is unique
-    if db[USER_TABLE].columns == ["id"]:
-        # Create the index directly if columns match
-        db[USER_TABLE].create_index(["user_id"], unique=True)
+def ensure_indexes(dataset):
+    """
+    Creates the columns and any missing declared indexes of every table in a DataSet.
+    """
+    for table_name, indexes in INDEXES.items():
+        # Columns must exist before they can be indexed
+        ensure_columns(table_name, TABLE_COLUMNS[table_name], dataset)
+        existing = {tuple(index["columns"]) for index in list_indexes(dataset, table_name)}
+        for columns, unique in indexes:
+            if tuple(columns) not in existing:
+                try:
+                    create_index(dataset, table_name, columns, unique)
+                except IntegrityError as e:
+                    print(f"Failed to create index on {table_name} {columns}: {e}")
 
-    # Ensure the status_id column is unique
-    if db[STATUS_TABLE].columns == ["id"]:
-        # Create the index directly if columns match
-        db[STATUS_TABLE].create_index(["status_id"], unique=True)
 
-    return db
+def create_index(dataset, table_name, columns, unique):
+    """
+    Creates an index on a table. A column may name a collation, as in "user_name COLLATE NOCASE".
+    """
+    if not any(" COLLATE " in column for column in columns):
+        dataset[table_name].create_index(columns, unique=unique)
+        return
+    name = re.sub(r"\W+", "_", "_".join([table_name] + columns)).lower()
+    definitions = []
+    for column in columns:
+        column_name, _, collation = column.partition(" COLLATE ")
+        definitions.append(f'"{column_name}"' + (f" COLLATE {collation}" if collation else ""))
+    dataset.query(
+        f'CREATE {"UNIQUE " if unique else ""}INDEX "{name}" ON "{table_name}" ({", ".join(definitions)})'
+    )
+
+
+def list_indexes(db, table_name):
+    """
+    Returns the name, columns and uniqueness of every index on a table. Columns with a
+    collation other than the default are listed as "<column> COLLATE <collation>".
+    """
+    indexes = []
+    for _, name, unique, *_ in db.query(f'PRAGMA index_list("{table_name}")').fetchall():
+        columns = [
+            column if collation == "BINARY" else f"{column} COLLATE {collation}"
+            for _, _, column, _, collation, key in db.query(f'PRAGMA index_xinfo("{name}")').fetchall()
+            if key
+        ]
+        indexes.append({"name": name, "columns": columns, "unique": bool(unique)})
+    return indexes
+
+
+def index_report():
+    """
+    Returns, for every table with declared indexes, the indexes present in the database
+    and the declared indexes that are missing.
+    """
+    report = {}
+    for table_name, indexes in INDEXES.items():
+        present = list_indexes(db, table_name)
+        columns_present = {tuple(index["columns"]) for index in present}
+        report[table_name] = {
+            "present": present,
+            "missing": [columns for columns, _ in indexes if tuple(columns) not in columns_present],
+        }
+    return report
+
+
+def ensure_status_search(dataset):
+    """
+    Creates the full-text index over status_text if it is missing and fills it from the
+    existing statuses. Triggers on the status table then keep it in sync with every insert,
+    update and delete, whether from add_status, update_status, delete_status or the loaders.
+    """
+    exists = dataset.query(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", [STATUS_SEARCH_TABLE]
+    ).fetchone()
+    if exists:
+        return
+    ensure_columns(STATUS_TABLE, TABLE_COLUMNS[STATUS_TABLE], dataset)
+    search, status = STATUS_SEARCH_TABLE, STATUS_TABLE
+    with dataset.transaction():
+        dataset.query(
+            f'CREATE VIRTUAL TABLE "{search}" USING fts5'
+            f"(status_text, content='{status}', content_rowid='id')"
+        )
+        dataset.query(
+            f'CREATE TRIGGER "{search}_insert" AFTER INSERT ON "{status}" BEGIN '
+            f'INSERT INTO "{search}"(rowid, status_text) VALUES (new.id, new.status_text); END'
+        )
+        dataset.query(
+            f'CREATE TRIGGER "{search}_delete" AFTER DELETE ON "{status}" BEGIN '
+            f'INSERT INTO "{search}"("{search}", rowid, status_text) '
+            f"VALUES ('delete', old.id, old.status_text); END"
+        )
+        dataset.query(
+            f'CREATE TRIGGER "{search}_update" AFTER UPDATE OF status_text ON "{status}" BEGIN '
+            f'INSERT INTO "{search}"("{search}", rowid, status_text) '
+            f"VALUES ('delete', old.id, old.status_text); "
+            f'INSERT INTO "{search}"(rowid, status_text) VALUES (new.id, new.status_text); END'
+        )
+        dataset.query(f'INSERT INTO "{search}"("{search}") VALUES (\'rebuild\')')
+
+
+# Lookup cache
+
+def enable_cache(maxsize=1024):
+    """
+    Turns on LRU caching of user and status lookups, each cache holding at most maxsize rows.
+    """
+    CACHES["user"] = create_cache(maxsize)
+    CACHES["status"] = create_cache(maxsize)
+
+
+def disable_cache():
+    """
+    Turns off caching of user and status lookups and drops the cached rows.
+    """
+    CACHES["user"] = None
+    CACHES["status"] = None
+
+
+def cache_report():
+    """
+    Returns the hit/miss counters of the lookup caches, or None for a disabled cache.
+    """
+    return {name: cache and cache_stats(cache) for name, cache in CACHES.items()}
+
+
+def find_user(user_id):
+    """
+    Looks up a user row by user_id, through the cache when caching is enabled.
+    """
+    if CACHES["user"] is None:
+        return db[USER_TABLE].find_one(user_id=user_id)
+    return cache_lookup(CACHES["user"], user_id, lambda key: db[USER_TABLE].find_one(user_id=key))
+
+
+def find_status(status_id):
+    """
+    Looks up a status row by status_id, through the cache when caching is enabled.
+    """
+    if CACHES["status"] is None:
+        return db[STATUS_TABLE].find_one(status_id=status_id)
+    return cache_lookup(CACHES["status"], status_id, lambda key: db[STATUS_TABLE].find_one(status_id=key))
+
+
+def invalidate_user(user_id):
+    """
+    Drops an edited user from the user lookup and verified-user caches.
+    """
+    invalidate_users({user_id})
+
+
+def invalidate_users(user_ids):
+    """
+    Drops a set of edited users from the user lookup and verified-user caches. Editing a user
+    does not change the user's statuses, so the status cache is left alone.
+    """
+    for user_id in user_ids:
+        if CACHES["user"] is not None:
+            cache_invalidate(CACHES["user"], user_id)
+        for verified_users in list(VERIFIED_USERS.values()):
+            verified_users.pop(user_id, None)
+
+
+def invalidate_deleted_users(user_ids):
+    """
+    Drops a set of deleted users and their statuses from every cache.
+    """
+    invalidate_users(user_ids)
+    if CACHES["status"] is not None:
+        cache_invalidate_where(CACHES["status"], lambda status: status["user_id"] in user_ids)
+
+
+def invalidate_status(status_id):
+    """
+    Drops a status from the lookup cache.
+    """
+    if CACHES["status"] is not None:
+        cache_invalidate(CACHES["status"], status_id)
 
 # Load databases
-def load_users(filename):
+def load_users(filename, rejects=None):
     """
     Opens a CSV file with user data and adds it to the database.
+    With rejects, the rows that cannot be added are written with a reason code to that
+    report file instead of printed, and the summary counts are returned instead of True.
     """
     try:
-        with open(filename, encoding="utf-8", newline="") as csvfile:
+        with open(filename, encoding="utf-8", newline="") as csvfile, rejection_report(rejects) as report:
             reader = csv.DictReader(csvfile)
+            loaded = 0
             for row in reader:
                 if all(
                         key in row and row[key]
@@ -51,20 +293,168 @@ def load_users(filename):
                     }
                     try:
                         db[USER_TABLE].insert(**user_data)
+                        loaded += 1
                     except IntegrityError:
-                        print(f"Failed to add user due to IntegrityError: {user_data}")
-            return True
+                        reject(report, "duplicate_user_id", user_data,
+                               f"Failed to add user due to IntegrityError: {user_data}")
+                else:
+                    reject(report, "missing_fields", row)
+            if report is None:
+                return True
+            return {"loaded": loaded, **report_summary(report)}
+    except (FileNotFoundError, KeyError) as e:
+        print(f"An error occurred while loading users: {e}")
+        return False
+
+
+def ensure_columns(table_name, columns, dataset=None):
+    """
+    Makes sure a table has the given columns before set-based statements run against it.
+    columns maps each column name to a sample value, which decides the column type.
+    DataSet only adds columns on a plain insert, so a dummy row is inserted and removed.
+    """
+    dataset = dataset or db
+    table = dataset[table_name]
+    if not set(columns).issubset(table.columns):
+        with dataset.transaction():
+            table.insert(id=-1, **columns)
+            table.delete(id=-1)
+        table = dataset[table_name]
+    return table
+
+
+def load_user_ids():
+    """
+    Returns the set of every user_id in the database, for validating many statuses in memory.
+    """
+    table = ensure_columns(USER_TABLE, TABLE_COLUMNS[USER_TABLE])
+    field = table.model_class.user_id
+    return {user_id for (user_id,) in table.model_class.select(field).tuples()}
+
+
+def split_orphans(statuses, user_ids=None):
+    """
+    Splits a batch of statuses into statuses whose user exists and orphaned statuses.
+    The batch's user_ids are checked with one set-based query, or against user_ids if given.
+    """
+    if user_ids is None:
+        table = ensure_columns(USER_TABLE, TABLE_COLUMNS[USER_TABLE])
+        user_ids = find_existing(table, "user_id", list({status["user_id"] for status in statuses}))
+    valid = []
+    orphans = []
+    for status in statuses:
+        (valid if status["user_id"] in user_ids else orphans).append(status)
+    return valid, orphans
+
+
+def user_rows(reader):
+    """
+    Generator of user rows, keyed by column, from the complete rows of a user CSV reader.
+    """
+    return (
+        {column: row[key] for key, column in USER_FIELDS.items()}
+        for row in reader
+        if all(row.get(key) for key in USER_FIELDS)
+    )
+
+
+def bulk_load_users(filename, batch_size=BATCH_SIZE, upsert=False, rejects=None):
+    """
+    Opens a CSV file with user data and adds it to the database in batches of batch_size rows,
+    one transaction per batch. Each batch is validated with validate_users first. Prints the
+    throughput of every batch, a count of the invalid rows per reason, and the rows rejected as
+    duplicates. With rejects, invalid and duplicate rows are written to that report file instead.
+    With upsert, existing users are updated instead of rejected, and the summary counts
+    inserted, updated, unchanged and invalid users.
+    Returns a summary dict, or False if the file could not be loaded.
+    """
+    try:
+        with open(filename, encoding="utf-8", newline="") as csvfile, \
+                rejection_report(rejects) as report:
+            # Rows stay tuples from the CSV reader to the INSERT, with no per-row dicts
+            rows = csv_tuples(csv.reader(csvfile), USER_FIELDS)
+            if upsert:
+                return upsert_users(rows, batch_size, report)
+            return insert_users(rows, batch_size, report)
     except (FileNotFoundError, KeyError) as e:
         print(f"An error occurred while loading users: {e}")
         return False
 
-def load_status_updates(filename):
+
+def insert_users(rows, batch_size=BATCH_SIZE, report=None):
+    """
+    Inserts user tuples, in the column order of USER_FIELDS, in batches of batch_size, one
+    transaction per batch. Each batch is validated with validate_users first; invalid and
+    duplicate rows are reported. Returns the summary counts, with the report summary if any.
+    """
+    table = ensure_columns(USER_TABLE, TABLE_COLUMNS[USER_TABLE])
+    columns = list(USER_FIELDS.values())
+    summary = {"loaded": 0, "duplicates": 0, "rejected": 0, "batches": 0}
+    for batch in chunked(rows, batch_size):
+        start = time.perf_counter()
+        valid, rejected = validate_users(batch, columns)
+        new_rows, duplicates = split_duplicates(table, valid, "user_id", columns.index("user_id"))
+        duplicates.extend(insert_batch(table, new_rows, columns))
+        elapsed = time.perf_counter() - start
+        loaded = len(valid) - len(duplicates)
+        report_invalid_users(rejected, columns, report)
+        report_duplicate_users(duplicates, columns, report)
+        summary["batches"] += 1
+        summary["loaded"] += loaded
+        summary["duplicates"] += len(duplicates)
+        summary["rejected"] += len(rejected)
+        print(
+            f"Batch {summary['batches']}: {loaded} users loaded in {elapsed:.3f}s "
+            f"({len(batch) / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+    if report is not None:
+        return {**summary, **report_summary(report)}
+    return summary
+
+
+def upsert_users(rows, batch_size=BATCH_SIZE, report=None):
+    """
+    Inserts or updates user tuples, in the column order of USER_FIELDS, in batches of
+    batch_size. Each batch is validated with validate_users first; with a report the invalid
+    rows are written to it. Returns the summary counts, with the report summary if any.
+    """
+    ensure_indexes(db)
+    table = db[USER_TABLE]
+    columns = list(USER_FIELDS.values())
+    summary = {"inserted": 0, "updated": 0, "unchanged": 0, "rejected": 0, "batches": 0}
+    for batch in chunked(rows, batch_size):
+        start = time.perf_counter()
+        valid, rejected = validate_users(batch, columns)
+        users = [dict(zip(columns, row)) for row in valid]
+        inserted, updated, unchanged = upsert_batch(table, users, "user_id")
+        elapsed = time.perf_counter() - start
+        report_invalid_users(rejected, columns, report)
+        invalidate_users({user["user_id"] for user in users})
+        summary["batches"] += 1
+        summary["inserted"] += inserted
+        summary["updated"] += updated
+        summary["unchanged"] += unchanged
+        summary["rejected"] += len(rejected)
+        print(
+            f"Batch {summary['batches']}: {inserted} users inserted, {updated} updated in {elapsed:.3f}s "
+            f"({len(batch) / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+    if report is not None:
+        return {**summary, **report_summary(report)}
+    return summary
+
+
+def load_status_updates(filename, rejects=None):
     """
     Opens a CSV file with status update data and adds it to the database.
+    Without rejects the load stops at the first status that cannot be added. With rejects,
+    such statuses are written with a reason code to that report file and the load goes on;
+    the summary counts are returned instead of True.
     """
     try:
-        with open(filename, encoding="utf-8", newline="") as csvfile:
+        with open(filename, encoding="utf-8", newline="") as csvfile, rejection_report(rejects) as report:
             reader = csv.DictReader(csvfile)
+            loaded = 0
             for row in reader:
                 if all(
                         key in row and row[key]
@@ -78,15 +468,38 @@ def load_status_updates(filename):
 
                     try:
                         db[STATUS_TABLE].insert(**status_data)
+                        loaded += 1
                     except IntegrityError:
-                        print(f"Failed to add status due to IntegrityError: {status_data}")
-                        return False
-            return True
+                        if report is None:
+                            print(f"Failed to add status due to IntegrityError: {status_data}")
+                            return False
+                        reject(report, "duplicate_status_id", status_data)
+                else:
+                    reject(report, "missing_fields", row)
+            if report is None:
+                return True
+            return {"loaded": loaded, **report_summary(report)}
     except (FileNotFoundError, KeyError) as e:
         print(f"An error occurred while loading statuses: {e}")
         return False
 
 
+def report_rejected_statuses(duplicates, orphans, report=None):
+    """
+    Prints the statuses rejected from a batch; orphans are summarised in one line.
+    With a report they are written to it instead.
+    """
+    for status_data in duplicates:
+        reject(report, "duplicate_status_id", status_data,
+               f"Failed to add status due to duplicate status_id: {status_data}")
+    if report is not None:
+        for status_data in orphans:
+            reject(report, "unknown_user_id", status_data)
+    elif orphans:
+        missing = sorted({status["user_id"] for status in orphans})
+        print(f"Failed to add {len(orphans)} statuses because user_id does not exist: {missing}")
+
+
 def validate_length(value, max_length):
     """Utility function to validate the length of a given value."""
     if len(value) > max_length:
@@ -94,6 +507,57 @@ def validate_length(value, max_length):
         return False
     return True
 
+
+def validate_users(rows, columns):
+    """
+    Validates a batch of user tuples a column at a time: every field is required, the
+    USER_LENGTH_LIMITS apply and user_email must match EMAIL_PATTERN.
+    Returns the valid rows and a rejection report of (row, reasons) pairs, where reasons
+    lists codes such as "missing_user_name", "too_long_user_id" or "invalid_user_email".
+    """
+    if not rows:
+        return [], []
+    reasons = {}
+    for column, values in zip(columns, zip(*rows)):
+        failures = [(index, f"missing_{column}") for index, value in enumerate(values) if not value]
+        if column in USER_LENGTH_LIMITS:
+            limit = USER_LENGTH_LIMITS[column]
+            failures += [(index, f"too_long_{column}") for index, value in enumerate(values)
+                         if len(value) > limit]
+        if column == "user_email":
+            match = EMAIL_PATTERN.fullmatch
+            failures += [(index, f"invalid_{column}") for index, value in enumerate(values)
+                         if value and not match(value)]
+        for index, reason in failures:
+            reasons.setdefault(index, []).append(reason)
+    if not reasons:
+        return list(rows), []
+    valid = [row for index, row in enumerate(rows) if index not in reasons]
+    return valid, [(rows[index], reasons[index]) for index in sorted(reasons)]
+
+
+def report_invalid_users(rejected, columns=None, report=None):
+    """
+    Prints one line summarising the users rejected by validate_users, counted per reason.
+    With a report every row is written to it, keyed by columns, instead.
+    """
+    if report is not None:
+        for row, reasons in rejected:
+            reject(report, ",".join(reasons), dict(zip(columns, row)))
+    elif rejected:
+        counts = collections.Counter(reason for _, reasons in rejected for reason in reasons)
+        print(f"Rejected {len(rejected)} invalid users: {dict(sorted(counts.items()))}")
+
+
+def report_duplicate_users(duplicates, columns, report=None):
+    """
+    Prints the user tuples rejected as duplicates, keyed by columns, or writes them to report.
+    """
+    for row in duplicates:
+        user_data = dict(zip(columns, row))
+        reject(report, "duplicate_user_id", user_data,
+               f"Failed to add user due to duplicate user_id: {user_data}")
+
 # User-related functions
 
 def add_user(user_data):
@@ -101,9 +565,9 @@ def add_user(user_data):
     Adds a new user to the database. Returns True if the user was added successfully, False otherwise.
     """
     # Validate user data
-    user_id_valid = validate_length(user_data['user_id'], 30)
-    user_name_valid = validate_length(user_data['user_name'], 30)
-    user_last_name_valid = validate_length(user_data['user_last_name'], 100)
+    user_id_valid = validate_length(user_data['user_id'], USER_LENGTH_LIMITS['user_id'])
+    user_name_valid = validate_length(user_data['user_name'], USER_LENGTH_LIMITS['user_name'])
+    user_last_name_valid = validate_length(user_data['user_last_name'], USER_LENGTH_LIMITS['user_last_name'])
 
     if not (user_id_valid and user_name_valid and user_last_name_valid):
         return False
@@ -125,22 +589,41 @@ def update_user(db, user_id, email, user_name, user_last_name):
     """
     Updates a user in the database.
     """
-    # Search for the user first
-    user_to_modify = search_user()(user_id=user_id)
-    if not user_to_modify:
-        print("Nothing to update.")
-        return False
-
-    # Perform the update within a transaction
+    # One conditional UPDATE; the affected-row count tells whether the user exists
     with db.transaction():
-        db[USER_TABLE].update(
+        updated = db[USER_TABLE].update(
             user_id=user_id,
             user_email=email,
             user_name=user_name,
             user_last_name=user_last_name,
             columns=["user_id"]
         )
-        return True
+    if not updated:
+        print("Nothing to update.")
+        return False
+    invalidate_user(user_id)
+    return True
+
+
+def update_users(changes):
+    """
+    Applies many user changes in one transaction. Each change is a dict with the user_id and
+    the columns to set. Returns a dict with the number updated and the user_ids not found.
+    """
+    users = db[USER_TABLE].model_class
+    summary = {"updated": 0, "missing": []}
+    changed = set()
+    with db.transaction():
+        for change in changes:
+            fields = dict(change)
+            user_id = fields.pop("user_id")
+            if users.update(**fields).where(users.user_id == user_id).execute():
+                summary["updated"] += 1
+                changed.add(user_id)
+            else:
+                summary["missing"].append(user_id)
+    invalidate_users(changed)
+    return summary
 
 
 def delete_user(user_id):
@@ -148,41 +631,43 @@ def delete_user(user_id):
     Deletes a user from the database and all associated statuses. Returns True if the deletion was successful, False otherwise.
     """
     try:
-        # Flag to track if all deletions are successful
-        all_statuses_deleted = True
-
-        # Retrieve and delete all statuses associated with the user
-        statuses = db[STATUS_TABLE].find(user_id=user_id)
-        for status in statuses:
-            status_id = status["status_id"]
-            try:
-                status_to_delete = db[STATUS_TABLE].find_one(status_id=status_id)
-                if status_to_delete:
-                    db[STATUS_TABLE].delete(id=status_to_delete["id"])
-                else:
-                    print(f"Status record not found for status_id: {status_id}")
-                    all_statuses_deleted = False
-            except Exception as e:
-                print(f"Failed to delete status with status_id: {status_id}. Error: {e}")
-                all_statuses_deleted = False
-
-        # Delete the user
-        user_to_delete = db[USER_TABLE].find_one(user_id=user_id)
-        if user_to_delete:
-            db[USER_TABLE].delete(id=user_to_delete["id"])
-            user_deleted = True
-        else:
-            print(f"User record not found for user_id: {user_id}")
-            user_deleted = False
+        # Delete the statuses and the user with one statement each, in one transaction
+        with db.transaction():
+            db[STATUS_TABLE].delete(user_id=user_id)
+            user_deleted = db[USER_TABLE].delete(user_id=user_id)
+        invalidate_deleted_users({user_id})
 
-        # Return True only if both statuses and user were successfully deleted
-        return all_statuses_deleted and user_deleted
+        if not user_deleted:
+            print(f"User record not found for user_id: {user_id}")
+            return False
+        return True
 
     except Exception as e:
         print(f"An error occurred while deleting user: {e}")
         return False
 
 
+def delete_users(user_ids):
+    """
+    Deletes many users and all their statuses in one transaction, using one statement per table
+    for every ROWS_PER_INSERT users. Returns a dict with the number of users and statuses deleted.
+    """
+    user_ids = list(user_ids)
+    users = ensure_columns(USER_TABLE, TABLE_COLUMNS[USER_TABLE])
+    statuses = ensure_columns(STATUS_TABLE, TABLE_COLUMNS[STATUS_TABLE])
+    deleted = {"users": 0, "statuses": 0}
+    with db.transaction():
+        for ids_chunk in chunked(user_ids, ROWS_PER_INSERT):
+            deleted["statuses"] += statuses.model_class.delete().where(
+                statuses.model_class.user_id.in_(ids_chunk)
+            ).execute()
+            deleted["users"] += users.model_class.delete().where(
+                users.model_class.user_id.in_(ids_chunk)
+            ).execute()
+    invalidate_deleted_users(set(user_ids))
+    return deleted
+
+
 def search_user():
     """
     Returns a function to search for a user by user_id in the database.
@@ -190,7 +675,7 @@ def search_user():
 
     def search(user_id):
         try:
-            user = db[USER_TABLE].find_one(user_id=user_id)
+            user = find_user(user_id)
             if user is None:
                 print(f"User with user_id {user_id} not found.")
                 return None
@@ -202,30 +687,81 @@ def search_user():
     return search
 
 
+def prefix_bound(prefix):
+    """
+    Returns the smallest string greater, in NOCASE order, than every string that starts with
+    prefix, or None if there is none. prefix must already be folded with NOCASE_FOLD.
+    """
+    while prefix and prefix[-1] == chr(0x10FFFF):
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    bound = chr(ord(prefix[-1]) + 1)
+    # NOCASE compares "A" to "Z" as "a" to "z", so the folded character after "@" is "["
+    if "A" <= bound <= "Z":
+        bound = "["
+    return prefix[:-1] + bound
+
+
+def search_users_by_prefix(prefix, field="user_name", limit=PREFIX_SEARCH_PAGE_SIZE,
+                           cursor=None):
+    """
+    Returns one page of the users whose field (user_name, user_last_name or user_email)
+    starts with prefix, ignoring the case of ASCII letters, ordered by that field and user_id,
+    together with the cursor of the next page, or None after the last page.
+    The query is a range scan over the (field COLLATE NOCASE, user_id) index declared in INDEXES.
+    """
+    if field not in PREFIX_SEARCH_FIELDS:
+        raise ValueError(f"Cannot search users by {field}")
+    table = ensure_columns(USER_TABLE, TABLE_COLUMNS[USER_TABLE])
+    model = table.model_class
+    column = getattr(model, field).collate("NOCASE")
+    # Folded, so the upper bound sorts after every match under NOCASE
+    prefix = prefix.translate(NOCASE_FOLD)
+    condition = column >= prefix
+    upper = prefix_bound(prefix)
+    if upper is not None:
+        condition &= column < upper
+    if cursor is not None:
+        condition &= Tuple(column, model.user_id) > Tuple(*cursor)
+    query = (model
+             .select(model.user_id, model.user_email, model.user_name, model.user_last_name)
+             .where(condition)
+             .order_by(column, model.user_id)
+             .limit(limit + 1)
+             .dicts())
+    users = list(query)
+    if len(users) <= limit:
+        return {"users": users, "cursor": None}
+    users = users[:limit]
+    return {"users": users, "cursor": (users[-1][field], users[-1]["user_id"])}
+
+
 # Status-related functions
 
-def create_add_status_function():  # Closure example
+def create_add_status_function(maxsize=VERIFIED_USERS_MAXSIZE):  # Closure example
     """
     Returns a function to add a new status for a user in the database with a closure to remember which users are already verified.
+    At most maxsize verified users are remembered; delete_user removes users from it.
     """
-    # Initialize a set to keep track of verified user IDs
-    verified_users = set()
+    # Bounded LRU cache of verified user IDs, registered so delete_user can invalidate it
+    verified_users = create_cache(maxsize)
+    VERIFIED_USERS[next(VERIFIED_USERS_IDS)] = verified_users["entries"]
+
+    def verify(user_id):
+        return True if find_user(user_id) else None
 
     def add_status(status_id, user_id, status_text):
         """
         Adds a new status for a user in the database. Returns True if the status was added successfully, False otherwise.
         """
-        # Check if user exists in the database
-        user_exists = db[USER_TABLE].find_one(user_id=user_id)
+        # Check if user exists, skipping the lookup for users verified before
+        user_exists = cache_lookup(verified_users, user_id, verify)
 
         # Check if the status_id already exists in the database
         status_exists = db[STATUS_TABLE].find_one(status_id=status_id)
 
-        # Use closure variable to track if user has already been verified
         if user_exists:
-            if user_id not in verified_users:
-                verified_users.add(user_id)  # Add user to the set of verified users
-
             if not status_exists:
                 try:
                     db[STATUS_TABLE].insert(
@@ -247,35 +783,81 @@ def create_add_status_function():  # Closure example
     return add_status
 
 
-def update_status(status_id, user_id, status_text):
+def add_status_batch(table, statuses, user_ids=None):
     """
-    Updates information for an existing status. Returns True if the update was successful, False otherwise.
+    Validates a batch of statuses against the users table in aggregate, then inserts the
+    valid ones. Returns (number added, duplicate statuses, orphaned statuses).
     """
-    # Search for the user first
-    status_to_modify = search_user()(user_id=user_id)
-    if not status_to_modify:
-        return False
+    valid, orphans = split_orphans(statuses, user_ids)
+    new_rows, duplicates = split_duplicates(table, valid, "status_id")
+    duplicates.extend(insert_batch(table, new_rows))
+    return len(valid) - len(duplicates), duplicates, orphans
 
-    # Check if the status ID exists in the status table
-    existing_status = db[STATUS_TABLE].find_one(status_id=status_id)
-    if not existing_status:
-        return False
 
+def bulk_add_statuses(statuses, batch_size=BATCH_SIZE, user_ids=None):
+    """
+    Adds many statuses, given as dicts with status_id, user_id and status_text.
+    Each batch is checked for unknown users with one query (or against the preloaded
+    user_ids set) and inserted in one transaction. Returns a summary dict.
+    """
+    table = ensure_columns(STATUS_TABLE, TABLE_COLUMNS[STATUS_TABLE])
+    summary = {"added": 0, "duplicates": 0, "orphans": 0}
+    for batch in chunked(statuses, batch_size):
+        with db.transaction():
+            added, duplicates, orphans = add_status_batch(table, batch, user_ids)
+        report_rejected_statuses(duplicates, orphans)
+        summary["added"] += added
+        summary["duplicates"] += len(duplicates)
+        summary["orphans"] += len(orphans)
+    return summary
+
+
+def update_status(status_id, user_id, status_text):
+    """
+    Updates information for an existing status. Returns True if the update was successful, False otherwise.
+    """
     try:
-        # Perform the update within a transaction
+        # One conditional UPDATE that only matches if both the status and the user exist
         with db.transaction():
-            db[STATUS_TABLE].update(
-                status_id=status_id,
-                user_id=user_id,
-                status_text=status_text,
-                columns=["status_id"]
-            )
-        return True
+            updated = status_update_query(status_id, user_id, status_text).execute()
+        invalidate_status(status_id)
+        return updated > 0
     except Exception as e:
         print(f"An error occurred during the transaction: {e}")
         return False
 
 
+def status_update_query(status_id, user_id, status_text):
+    """
+    Builds an UPDATE of a status that only changes a row if user_id exists in the user table.
+    """
+    statuses = db[STATUS_TABLE].model_class
+    users = db[USER_TABLE].model_class
+    user_exists = fn.EXISTS(users.select(SQL("1")).where(users.user_id == user_id))
+    return statuses.update(user_id=user_id, status_text=status_text).where(
+        (statuses.status_id == status_id) & user_exists
+    )
+
+
+def update_statuses(changes):
+    """
+    Applies many status changes in one transaction. Each change is a dict with status_id,
+    user_id and status_text; a change is skipped if the status or the user does not exist.
+    Returns a dict with the number updated and the status_ids skipped.
+    """
+    changes = list(changes)
+    summary = {"updated": 0, "skipped": []}
+    with db.transaction():
+        for change in changes:
+            if status_update_query(change["status_id"], change["user_id"], change["status_text"]).execute():
+                summary["updated"] += 1
+            else:
+                summary["skipped"].append(change["status_id"])
+    for change in changes:
+        invalidate_status(change["status_id"])
+    return summary
+
+
 def delete_status(status_id):
     """
     Deletes a status from the database. Returns True if the deletion was successful, False otherwise.
@@ -284,6 +866,7 @@ def delete_status(status_id):
         status_to_delete = db[STATUS_TABLE].find_one(status_id=status_id)
         if status_to_delete:
             db[STATUS_TABLE].delete(id=status_to_delete["id"])
+            invalidate_status(status_id)
             return True
         print(f"Status record not found for status_id: {status_id} ")
         return False
@@ -298,29 +881,48 @@ def search_status(status_id):
     Searches for a status in the database and returns its data if found.
     """
     try:
-        return db[STATUS_TABLE].find_one(status_id=status_id)
+        return find_status(status_id)
     except Exception as e:
         print(f"An error occurred while searching for status: {e}")
         return None
 
-# # not sure if needed?
-# def delete_status_without_user():
-#     """
-#     Delete statuses without a user in the database.
-#     """
-#     user_table = db[USER_TABLE]
-#     status_table = db[STATUS_TABLE]
-#     user_query = user_table.find()
-#     status_query = status_table.find()
-#
-#     status_user_id_set = set()
-#     for status in status_query:
-#         status_user_id_set.add(status["user_id"])
-#     user_id_set = set()
-#     for user in user_query:
-#         user_id_set.add(user["user_id"])
-#
-#     difference = list(status_user_id_set.difference(user_id_set))
-#     with db.transaction():
-#         for diff in difference:
-#             status_table.delete(user_id=diff)
+def list_statuses(user_id, after=None, limit=STATUS_PAGE_SIZE):
+    """
+    Returns up to limit statuses of a user ordered by status_id, starting after the
+    status_id after. Pass the last status_id of a page as after to get the next one;
+    every page is a seek on the (user_id, status_id) index, however deep it is.
+    """
+    return list(list_statuses_query(user_id, after, limit))
+
+
+def list_statuses_query(user_id, after=None, limit=STATUS_PAGE_SIZE):
+    """
+    Returns the query list_statuses runs for a page of a user's statuses.
+    """
+    table = ensure_columns(STATUS_TABLE, TABLE_COLUMNS[STATUS_TABLE])
+    model = table.model_class
+    condition = model.user_id == user_id
+    if after is not None:
+        condition &= model.status_id > after
+    return (model
+            .select(model.status_id, model.user_id, model.status_text)
+            .where(condition)
+            .order_by(model.status_id)
+            .limit(limit)
+            .dicts())
+
+
+def delete_status_without_user(batch_size=BATCH_SIZE):
+    """
+    Deletes statuses whose user no longer exists, batch_size statuses per transaction,
+    and drops them from the lookup cache. Returns the number of statuses deleted.
+    """
+    user_table = ensure_columns(USER_TABLE, TABLE_COLUMNS[USER_TABLE])
+    ensure_columns(STATUS_TABLE, TABLE_COLUMNS[STATUS_TABLE])
+    deleted = user_status.delete_status_without_user(db, batch_size)
+    if deleted and CACHES["status"] is not None:
+        cached_user_ids = {status["user_id"] for status in cache_values(CACHES["status"])}
+        user_ids = find_existing(user_table, "user_id", cached_user_ids)
+        cache_invalidate_where(CACHES["status"], lambda status: status["user_id"] not in user_ids)
+    print(f"Deleted {deleted} statuses without a user")
+    return deleted
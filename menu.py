@@ -4,6 +4,7 @@ Provides a basic frontend for the social network project
 
 import sys
 import main
+import search
 
 
 def load_users():
@@ -83,6 +84,26 @@ def search_user():
         print("User not found")
 
 
+def search_users_by_prefix():
+    """
+    Finds users whose name, last name or email starts with the given text, a page at a time.
+    """
+    fields = {"N": "user_name", "L": "user_last_name", "E": "user_email"}
+    field = fields.get(input("Search by N: name, L: last name, E: email: ").upper(), "user_name")
+    prefix = input("Starts with: ")
+    cursor = None
+    while True:
+        page = main.search_users_by_prefix(prefix, field, cursor=cursor)
+        if not page["users"] and cursor is None:
+            print("No users found")
+        for user in page["users"]:
+            print(f"{user['user_id']}: {user['user_name']} {user['user_last_name']} "
+                  f"<{user['user_email']}>")
+        cursor = page["cursor"]
+        if cursor is None or input("Show more? (y/n): ").lower() != "y":
+            return
+
+
 def delete_user():
     """
     Deletes a user from the database.
@@ -139,6 +160,26 @@ def search_status():
         print("Status not found")
 
 
+def search_status_text():
+    """
+    Searches statuses by keywords, one page at a time.
+    """
+    text = input('Enter words to search for: ')
+    offset = 0
+    while True:
+        results = search.search_statuses(text, offset=offset)
+        if not results:
+            print("No statuses found" if not offset else "No more statuses")
+            return
+        for result in results:
+            print(f"{result['status_id']} ({result['user_id']}): {result['status_text']}")
+        offset += len(results)
+        if len(results) < search.STATUS_SEARCH_PAGE_SIZE:
+            return
+        if input("Show more? (y/n): ").lower() != "y":
+            return
+
+
 def delete_status():
     """
     Deletes a status from the database.
@@ -165,6 +206,7 @@ def quit_program():
 
 
 if __name__ == "__main__":
+    main.init_database()
     menu_options = {
         "A": load_users,
         "B": load_status_updates,
@@ -176,6 +218,8 @@ if __name__ == "__main__":
         "H": update_status,
         "I": search_status,
         "J": delete_status,
+        "K": search_status_text,
+        "L": search_users_by_prefix,
         "Q": quit_program,
     }
 
@@ -192,6 +236,8 @@ if __name__ == "__main__":
                             H: Update status
                             I: Search status
                             J: Delete status
+                            K: Search status text
+                            L: Find users by name prefix
                             Q: Quit
 
                             Please enter your choice: """
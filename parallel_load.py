@@ -0,0 +1,277 @@
+"""
+Pipelined CSV loading: worker processes parse and validate byte-range shards of a file
+while the calling process writes the validated batches to the database
+"""
+
+import csv
+import multiprocessing
+import os
+import queue
+import time
+from rejections import reject, rejection_report, report_summary
+import loaders
+import main
+
+# Batches waiting for the writer; workers block once the queue is full
+QUEUE_SIZE = 8
+# Seconds the writer waits for a batch before checking that the workers are alive
+POLL_TIMEOUT = 1
+# Bytes read at a time while counting quotes to place shard boundaries
+SCAN_SIZE = 1 << 20
+
+
+def shard_offsets(filename, shards):
+    """
+    Splits the rows of a CSV file into at most shards byte ranges that start and end on
+    record boundaries, so a quoted field holding a line break stays in one shard.
+    Returns the header and a list of (start, end) offsets.
+    A line break ends a record when the quotes before it are balanced, which holds as long
+    as quotes only appear in quoted fields, as in RFC 4180.
+    """
+    size = os.path.getsize(filename)
+    with open(filename, "rb") as csvfile:
+        header = next(csv.reader([csvfile.readline().decode("utf-8")]), [])
+        first_row = csvfile.tell()
+        boundaries = [first_row]
+        quotes = 0
+        for shard in range(1, shards):
+            target = first_row + (size - first_row) * shard // shards
+            if target <= boundaries[-1]:
+                continue
+            # count the quotes up to the byte before target, then finish lines until one
+            # ends outside a quoted field, landing on a record start
+            while csvfile.tell() < target - 1:
+                block = csvfile.read(min(SCAN_SIZE, target - 1 - csvfile.tell()))
+                quotes += block.count(b'"')
+            for line in iter(csvfile.readline, b""):
+                quotes += line.count(b'"')
+                if quotes % 2 == 0:
+                    break
+            if boundaries[-1] < csvfile.tell() < size:
+                boundaries.append(csvfile.tell())
+    boundaries.append(size)
+    return header, list(zip(boundaries, boundaries[1:]))
+
+
+def validate_statuses(rows, columns):
+    """
+    Validates a batch of status tuples: every field is required. Returns the valid rows and
+    the (row, reasons) pairs of the others, like main.validate_users.
+    """
+    valid, rejected = [], []
+    for row in rows:
+        reasons = [f"missing_{column}" for column, value in zip(columns, row) if not value]
+        if reasons:
+            rejected.append((row, reasons))
+        else:
+            valid.append(row)
+    return valid, rejected
+
+
+def report_invalid_statuses(rejected, columns, report=None):
+    """
+    Prints how many statuses validate_statuses rejected. With a report every row is written
+    to it, keyed by columns, instead.
+    """
+    if report is not None:
+        for row, reasons in rejected:
+            reject(report, ",".join(reasons), dict(zip(columns, row)))
+    elif rejected:
+        print(f"Rejected {len(rejected)} statuses with missing fields")
+
+
+def parse_shard(job, start, end, batches):
+    """
+    Worker process: parses the rows of job["filename"] between two byte offsets, validates
+    them a batch at a time with job["validate"], and puts ("batch", rows, rejected) items on
+    the batches queue, rejected holding the (row, reasons) pairs of the invalid rows. Ends
+    with ("done", None, []), or ("error", message, []) if the shard is not valid CSV.
+    """
+    positions = [job["header"].index(key) for key in job["fields"]]
+    columns = list(job["fields"].values())
+    rows = []
+
+    def put_batch():
+        valid, rejected = job["validate"](rows, columns)
+        batches.put(("batch", valid, rejected))
+
+    with open(job["filename"], "rb") as csvfile:
+        csvfile.seek(start)
+        position = start
+
+        def lines():
+            nonlocal position
+            while position < end:
+                line = csvfile.readline()
+                if not line:
+                    return
+                position += len(line)
+                yield line.decode("utf-8")
+
+        # strict, so a quoted field left open at the end of the shard fails the load instead
+        # of being cut short
+        try:
+            for values in csv.reader(lines(), strict=True):
+                if not values:
+                    continue
+                rows.append(tuple(values[index] if index < len(values) else ""
+                                  for index in positions))
+                if len(rows) >= job["batch_size"]:
+                    put_batch()
+                    rows = []
+        except csv.Error as e:
+            batches.put(("error", f"{e} before byte {position} of {job['filename']}", []))
+            return
+    put_batch()
+    batches.put(("done", None, []))
+
+
+def write_user_batch(rows, columns, report=None):
+    """
+    Writes a batch of user tuples and reports the duplicates. Returns the numbers rejected as
+    duplicates and orphans (none).
+    """
+    table = main.db[main.USER_TABLE]
+    new_rows, duplicates = loaders.split_duplicates(table, rows, "user_id",
+                                                    columns.index("user_id"))
+    duplicates.extend(loaders.insert_batch(table, new_rows, columns))
+    main.report_duplicate_users(duplicates, columns, report)
+    return len(duplicates), 0
+
+
+def write_status_batch(rows, columns, report=None):
+    """
+    Writes a batch of status tuples and reports the duplicates and orphans. Returns the
+    numbers rejected as duplicates and as orphans.
+    """
+    statuses = [dict(zip(columns, row)) for row in rows]
+    with main.db.transaction():
+        _, duplicates, orphans = main.add_status_batch(main.db[main.STATUS_TABLE], statuses)
+    main.report_rejected_statuses(duplicates, orphans, report)
+    return len(duplicates), len(orphans)
+
+
+# What a parallel load reads, how it validates rows, reports the invalid ones and writes the
+# others, per table
+USER_LOAD = {
+    "fields": main.USER_FIELDS,
+    "validate": main.validate_users,
+    "report_invalid": main.report_invalid_users,
+    "write_batch": write_user_batch,
+}
+STATUS_LOAD = {
+    "fields": main.STATUS_FIELDS,
+    "validate": validate_statuses,
+    "report_invalid": report_invalid_statuses,
+    "write_batch": write_status_batch,
+}
+
+
+def parallel_load(filename, load, workers=None, batch_size=main.BATCH_SIZE, rejects=None):
+    """
+    Loads a CSV file with a pool of parser processes feeding a single writer, the calling
+    process, through a bounded queue. load is USER_LOAD or STATUS_LOAD: its write_batch writes
+    a batch of rows, reports the rejected ones and returns the numbers rejected as duplicates
+    and as orphans. With rejects, invalid and rejected rows are written to that report file
+    instead of printed, and the summary includes the report summary.
+    If the writer or a parser fails, the remaining parsers are stopped before the error is
+    raised. Returns a summary dict.
+    """
+    workers = workers or os.cpu_count() or 1
+    header, shards = shard_offsets(filename, workers)
+    missing = [key for key in load["fields"] if key not in header]
+    if missing:
+        raise KeyError(", ".join(missing))
+    job = {
+        "filename": filename,
+        "header": header,
+        "fields": load["fields"],
+        "validate": load["validate"],
+        "batch_size": batch_size,
+    }
+    batches = multiprocessing.Queue(QUEUE_SIZE)
+    processes = [
+        multiprocessing.Process(target=parse_shard, args=(job, start, end, batches), daemon=True)
+        for start, end in shards
+    ]
+    for process in processes:
+        process.start()
+    try:
+        with rejection_report(rejects) as report:
+            summary = write_batches(batches, processes, load, report)
+            if report is not None:
+                return {**summary, **report_summary(report)}
+            return summary
+    finally:
+        # parsers that are done have exited; the others may be blocked on the full queue
+        for process in processes:
+            process.terminate()
+            process.join()
+
+
+def write_batches(batches, processes, load, report=None):
+    """
+    Writes the batches the parser processes put on the queue until every one is done,
+    reporting the invalid rows with load["report_invalid"]. Returns a summary dict.
+    """
+    columns = list(load["fields"].values())
+    summary = {
+        "loaded": 0, "rejected": 0, "duplicates": 0, "orphans": 0, "batches": 0,
+        "workers": len(processes),
+    }
+    done = 0
+    while done < len(processes):
+        try:
+            kind, rows, rejected = batches.get(timeout=POLL_TIMEOUT)
+        except queue.Empty:
+            if any(process.exitcode not in (None, 0) for process in processes):
+                raise RuntimeError("A parser process failed") from None
+            continue
+        if kind == "error":
+            raise csv.Error(rows)
+        if kind == "done":
+            done += 1
+            continue
+        load["report_invalid"](rejected, columns, report)
+        summary["rejected"] += len(rejected)
+        if rows:
+            start = time.perf_counter()
+            duplicates, orphans = load["write_batch"](rows, columns, report)
+            elapsed = time.perf_counter() - start
+            written = len(rows) - duplicates - orphans
+            summary["batches"] += 1
+            summary["loaded"] += written
+            summary["duplicates"] += duplicates
+            summary["orphans"] += orphans
+            print(f"Batch {summary['batches']}: {written} rows written in {elapsed:.3f}s "
+                  f"({len(rows) / elapsed if elapsed else 0:.0f} rows/s)")
+    return summary
+
+
+def parallel_load_users(filename, workers=None, batch_size=main.BATCH_SIZE, rejects=None):
+    """
+    Loads a user CSV file with parallel parsing and validation by main.validate_users.
+    With rejects, rejected rows are written to that report file instead of printed.
+    Returns a summary dict, or False if the file could not be loaded.
+    """
+    try:
+        main.ensure_columns(main.USER_TABLE, main.TABLE_COLUMNS[main.USER_TABLE])
+        return parallel_load(filename, USER_LOAD, workers, batch_size, rejects)
+    except (FileNotFoundError, KeyError, csv.Error, RuntimeError) as e:
+        print(f"An error occurred while loading users: {e}")
+        return False
+
+
+def parallel_load_status_updates(filename, workers=None, batch_size=main.BATCH_SIZE,
+                                 rejects=None):
+    """
+    Loads a status CSV file with parallel parsing; statuses of unknown users are rejected.
+    With rejects, rejected rows are written to that report file instead of printed.
+    Returns a summary dict, or False if the file could not be loaded.
+    """
+    try:
+        main.ensure_columns(main.STATUS_TABLE, main.TABLE_COLUMNS[main.STATUS_TABLE])
+        return parallel_load(filename, STATUS_LOAD, workers, batch_size, rejects)
+    except (FileNotFoundError, KeyError, csv.Error, RuntimeError) as e:
+        print(f"An error occurred while loading statuses: {e}")
+        return False
@@ -0,0 +1,78 @@
+"""
+Rejection reports: rows a loader could not add, written with a reason code to a buffered
+JSON Lines sidecar file instead of being printed one by one.
+Each line of the file is {"reason": ..., "row": {...}}.
+"""
+
+import collections
+import json
+from contextlib import contextmanager
+
+# Bytes buffered before the report file is written to disk
+BUFFER_SIZE = 1 << 16
+
+
+def open_report(filename, mode="w"):
+    """
+    Opens a report file and returns the report; use mode "a" to add to an earlier report
+    """
+    return {
+        "filename": filename,
+        "file": open(filename, mode, encoding="utf-8", buffering=BUFFER_SIZE),  # pylint: disable=R1732
+        "counts": collections.Counter(),
+    }
+
+
+def close_report(report):
+    """
+    Flushes and closes a report file and returns its summary
+    """
+    report["file"].close()
+    return report_summary(report)
+
+
+@contextmanager
+def rejection_report(filename, mode="w"):
+    """
+    Context manager that yields an open report, or None if filename is None,
+    and closes it at the end of the block
+    """
+    if filename is None:
+        yield None
+        return
+    report = open_report(filename, mode)
+    try:
+        yield report
+    finally:
+        report["file"].close()
+
+
+def reject(report, reason, row, message=None):
+    """
+    Records a rejected row under reason. Without a report the message, if any, is printed instead.
+    """
+    if report is None:
+        if message:
+            print(message)
+        return
+    report["file"].write(json.dumps({"reason": reason, "row": row}) + "\n")
+    report["counts"][reason] += 1
+
+
+def report_summary(report):
+    """
+    Returns the number of rejected rows, their count per reason and the report file
+    """
+    return {
+        "rejected": sum(report["counts"].values()),
+        "reasons": dict(sorted(report["counts"].items())),
+        "rejects": report["filename"],
+    }
+
+
+def read_report(filename):
+    """
+    Returns the (reason, row) pairs recorded in a report file
+    """
+    with open(filename, encoding="utf-8") as report_file:
+        return [(entry["reason"], entry["row"]) for entry in map(json.loads, report_file)]
@@ -0,0 +1,41 @@
+"""
+Search over statuses and users: full-text search of status_text
+"""
+
+# pylint: disable=W0718
+import main
+
+# FTS5 matches per page of search_statuses
+STATUS_SEARCH_PAGE_SIZE = 10
+
+
+def search_query(text):
+    """
+    Turns free text into an FTS5 query matching statuses that contain every word.
+    Words are quoted, so punctuation and FTS5 operators in the text are searched literally.
+    """
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+def search_statuses(text, limit=STATUS_SEARCH_PAGE_SIZE, offset=0):
+    """
+    Returns one page of the statuses containing every word of text, best match first.
+    Each result holds status_id, user_id, status_text and its rank (lower is better).
+    """
+    query = search_query(text)
+    if not query:
+        return []
+    search = main.STATUS_SEARCH_TABLE
+    try:
+        main.ensure_status_search(main.db)
+        cursor = main.db.query(
+            f'SELECT s.status_id, s.user_id, s.status_text, bm25("{search}") AS rank '
+            f'FROM "{search}" JOIN "{main.STATUS_TABLE}" AS s ON s.id = "{search}".rowid '
+            f'WHERE "{search}" MATCH ? ORDER BY rank, s.id LIMIT ? OFFSET ?',
+            [query, limit, offset],
+        )
+        columns = ["status_id", "user_id", "status_text", "rank"]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    except Exception as e:
+        print(f"An error occurred while searching statuses: {e}")
+        return []
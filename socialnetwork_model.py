@@ -1,16 +1,179 @@
 """
 implements database as a social network model
+
+Connections come from a per-database pool. A thread keeps the connection it first used
+until it releases it with close_connection() or by leaving a connection() block, so
+request handlers should release theirs once a request is done. A connection still held
+when its thread ends is closed and its pool slot reclaimed.
 """
 
-# pylint: disable=R0903, E0401
+# pylint: disable=R0903, E0401, W0223
+import threading
+import weakref
+from contextlib import contextmanager
 from playhouse.dataset import DataSet
+from playhouse.pool import PooledSqliteDatabase
 
 DATABASE = "databaseA08.db"
+# Connections kept per database file; each thread borrows one at a time
+MAX_CONNECTIONS = 8
+# Seconds an idle connection stays in the pool before it is recycled
+STALE_TIMEOUT = 300
+
+# SQLite pragmas applied to every new connection, per workload.
+# WAL lets readers run alongside a writer; cache_size is in KiB when negative.
+PROFILES = {
+    "serving": {
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "temp_store": "memory",
+    },
+    "bulk_load": {
+        "journal_mode": "wal",
+        "synchronous": "off",
+        "cache_size": -256000,
+        "mmap_size": 1073741824,
+        "temp_store": "memory",
+    },
+}
+DEFAULT_PROFILE = "serving"
+
+
+class ThreadPooledSqliteDatabase(PooledSqliteDatabase):
+    """
+    Connection pool that reclaims the connection of a thread that ends without releasing it,
+    and brings a checked-out connection up to date with the pragmas of the current profile
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._leases = threading.local()
+        self._finalizers = {}
+        self._profile_version = 0
+        self._connection_versions = {}
+        super().__init__(*args, **kwargs)
+
+    def _connect(self):
+        conn = super()._connect()
+        key = self.conn_key(conn)
+        with self._pool_lock:
+            if self._connection_versions.get(key) != self._profile_version:
+                self._set_pragmas(conn)
+                self._connection_versions[key] = self._profile_version
+            # The lease lives in the thread's local storage, so it is freed when the thread ends
+            lease = threading.Event()
+            self._leases.lease = lease
+            self._finalizers[key] = weakref.finalize(lease, self._reclaim, conn)
+        return conn
+
+    def _close(self, conn, close_conn=False):
+        key = self.conn_key(conn)
+        with self._pool_lock:
+            finalizer = self._finalizers.pop(key, None)
+            if finalizer is not None:
+                finalizer.detach()
+            if close_conn:
+                self._connection_versions.pop(key, None)
+        super()._close(conn, close_conn)
+
+    def _reclaim(self, conn):
+        """
+        Closes the connection of a thread that ended while holding it, freeing its slot
+        """
+        self._close(conn, close_conn=True)
+
+    def profile_changed(self):
+        """
+        Marks every pooled connection as needing the current pragmas at its next checkout
+        """
+        with self._pool_lock:
+            self._profile_version += 1
+
+
+# One shared DataSet and connection pool per database file
+DATASETS = {}
+POOLS = {}
+DATASETS_LOCK = threading.Lock()
+
+
+def get_ds(database=DATABASE, profile=DEFAULT_PROFILE):
+    """
+    Gets and returns the database used in other files.
+    The DataSet is created and its tables introspected only once per database file;
+    later calls return the same DataSet, and each thread uses its own pooled connection,
+    which it should release with close_connection() when done.
+    The pragmas of profile are applied when the DataSet is created; use apply_profile to switch.
+    """
+    with DATASETS_LOCK:
+        if database not in DATASETS:
+            # Pooled connections move between threads, but only one thread uses each at a time
+            POOLS[database] = ThreadPooledSqliteDatabase(
+                database,
+                max_connections=MAX_CONNECTIONS,
+                stale_timeout=STALE_TIMEOUT,
+                check_same_thread=False,
+                pragmas=PROFILES[profile],
+            )
+            DATASETS[database] = DataSet(POOLS[database])
+        return DATASETS[database]
+
+
+def apply_profile(profile, database=DATABASE):
+    """
+    Switches a database to another performance profile, e.g. "bulk_load" before a large load.
+    The pragmas take effect on the calling thread's connection at once, and on every other
+    pooled connection the next time a thread checks it out.
+    """
+    get_ds(database)
+    for key, value in PROFILES[profile].items():
+        POOLS[database].pragma(key, value, permanent=True)
+    POOLS[database].profile_changed()
+
+
+def pragma_report(database=DATABASE):
+    """
+    Returns the current value of every profile pragma on the calling thread's connection
+    """
+    get_ds(database)
+    return {key: POOLS[database].pragma(key) for key in PROFILES[DEFAULT_PROFILE]}
+
+
+def open_connection(database=DATABASE):
+    """
+    Borrows a connection from the pool for the calling thread, reusing it if already open
+    """
+    get_ds(database).connect(reuse_if_open=True)
+
+
+def close_connection(database=DATABASE):
+    """
+    Returns the calling thread's connection to the pool
+    """
+    if database in DATASETS:
+        DATASETS[database].close()
+
+
+@contextmanager
+def connection(database=DATABASE):
+    """
+    Context manager that holds a pooled connection for the duration of a block
+    and yields the shared DataSet
+    """
+    open_connection(database)
+    try:
+        yield get_ds(database)
+    finally:
+        close_connection(database)
 
 
-def get_ds():
+def close_ds(database=None):
     """
-    Gets and returns the database used in other files
+    Closes every connection of a database, or of all databases if none is given,
+    and forgets the shared DataSet so the next get_ds starts fresh
     """
-    db = DataSet(f"sqlite:///{DATABASE}")
-    return db
+    with DATASETS_LOCK:
+        for name in [database] if database else list(DATASETS):
+            if name in DATASETS:
+                DATASETS.pop(name)
+                POOLS.pop(name).close_all()
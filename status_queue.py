@@ -0,0 +1,148 @@
+"""
+Write-behind queue for posting statuses at a high rate.
+Statuses posted by many callers are collected by a writer thread and committed together,
+every flush_interval seconds or max_rows statuses, whichever comes first. Each post returns
+a future that resolves once its status is committed: True if it was added, False if it was
+rejected as a duplicate or for an unknown user.
+The writer commits with synchronous=FULL on its own connection, so a resolved status survives
+a power loss even under the serving profile's WAL with synchronous=NORMAL, which only
+guarantees it survives an application crash. Group commit keeps that to one sync per group.
+"""
+
+# pylint: disable=W0718
+import concurrent.futures
+import queue
+import threading
+import time
+import main
+
+# Seconds the first status of a group waits for more to arrive
+FLUSH_INTERVAL = 0.005
+# Most statuses committed together in one transaction
+MAX_ROWS = 500
+# Statuses waiting for the writer; posting blocks once the queue is full
+QUEUE_SIZE = 10000
+# synchronous pragma of the writer's connection while it runs
+WRITER_SYNCHRONOUS = "FULL"
+
+
+def create_status_queue(flush_interval=FLUSH_INTERVAL, max_rows=MAX_ROWS, user_ids=None,
+                        maxsize=QUEUE_SIZE):
+    """
+    Starts a writer thread and returns the status queue.
+    user_ids may be a preloaded set of known users (see main.load_user_ids).
+    """
+    status_queue = {
+        "queue": queue.Queue(maxsize),
+        "table": main.ensure_columns(main.STATUS_TABLE, main.TABLE_COLUMNS[main.STATUS_TABLE]),
+        "flush_interval": flush_interval,
+        "max_rows": max_rows,
+        "user_ids": user_ids,
+        # Guards posted, which every posting thread updates
+        "lock": threading.Lock(),
+        "posted": 0,
+        "committed": 0,
+        "rejected": 0,
+        "commits": 0,
+    }
+    status_queue["thread"] = threading.Thread(
+        target=run_writer, args=(status_queue,), name="status-writer", daemon=True
+    )
+    status_queue["thread"].start()
+    return status_queue
+
+
+def post_status(status_queue, status_id, user_id, status_text):
+    """
+    Queues a status for the next group commit and returns its future
+    """
+    future = concurrent.futures.Future()
+    status = {"status_id": status_id, "user_id": user_id, "status_text": status_text}
+    status_queue["queue"].put((status, future))
+    with status_queue["lock"]:
+        status_queue["posted"] += 1
+    return future
+
+
+def close_status_queue(status_queue):
+    """
+    Commits every queued status, then stops the writer thread
+    """
+    status_queue["queue"].put(None)
+    status_queue["thread"].join()
+
+
+def status_queue_stats(status_queue):
+    """
+    Returns the queue depth and the posted, committed, rejected and commit counters
+    """
+    return {
+        "depth": status_queue["queue"].qsize(),
+        "posted": status_queue["posted"],
+        "committed": status_queue["committed"],
+        "rejected": status_queue["rejected"],
+        "commits": status_queue["commits"],
+    }
+
+
+def next_group(status_queue):
+    """
+    Waits for a status, then collects more until the group is full or flush_interval has
+    passed. Returns the group and whether the queue was closed.
+    """
+    posts = status_queue["queue"]
+    post = posts.get()
+    if post is None:
+        return [], True
+    group = [post]
+    deadline = time.monotonic() + status_queue["flush_interval"]
+    while len(group) < status_queue["max_rows"]:
+        try:
+            post = posts.get(timeout=max(deadline - time.monotonic(), 0))
+        except queue.Empty:
+            break
+        if post is None:
+            return group, True
+        group.append(post)
+    return group, False
+
+
+def run_writer(status_queue):
+    """
+    Writer thread: commits groups of posted statuses until the queue is closed, with
+    WRITER_SYNCHRONOUS on its connection, restored before the connection is released
+    """
+    closed = False
+    (synchronous,) = main.db.query("PRAGMA synchronous").fetchone()
+    try:
+        main.db.query(f"PRAGMA synchronous = {WRITER_SYNCHRONOUS}")
+        while not closed:
+            group, closed = next_group(status_queue)
+            if group:
+                commit_group(status_queue, group)
+    finally:
+        main.db.query(f"PRAGMA synchronous = {synchronous}")
+        main.db.close()
+
+
+def commit_group(status_queue, group):
+    """
+    Inserts a group of statuses in one transaction and resolves their futures
+    """
+    statuses = [status for status, _ in group]
+    try:
+        with main.db.transaction():
+            _, duplicates, orphans = main.add_status_batch(
+                status_queue["table"], statuses, status_queue["user_ids"]
+            )
+    except Exception as e:
+        for _, future in group:
+            future.set_exception(e)
+        return
+    main.report_rejected_statuses(duplicates, orphans)
+    rejected = {id(status) for status in duplicates + orphans}
+    for status, future in group:
+        future.set_result(id(status) not in rejected)
+    status_queue["commits"] += 1
+    status_queue["committed"] += len(group) - len(rejected)
+    status_queue["rejected"] += len(rejected)
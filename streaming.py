@@ -0,0 +1,172 @@
+"""
+Resumable streaming of a status CSV file into the database: every batch is committed
+together with a checkpoint, so an interrupted load resumes where it stopped
+"""
+
+import os
+from peewee import chunked
+from rejections import reject, rejection_report, report_summary
+import loaders
+import main
+
+CHECKPOINT_TABLE = "LoadCheckpoint"
+# file_size and file_mtime identify the file a checkpoint was taken from
+CHECKPOINT_COLUMNS = {
+    "filename": "", "byte_offset": 0, "row_number": 0, "file_size": 0, "file_mtime": 0,
+}
+
+
+def get_checkpoint(filename):
+    """
+    Returns the (byte_offset, row_number) recorded for a file, or (0, 0) if there is none.
+    A checkpoint taken from a file of another size or modification time, such as an
+    earlier dump written under the same name, is ignored.
+    """
+    table = main.ensure_columns(CHECKPOINT_TABLE, CHECKPOINT_COLUMNS)
+    checkpoint = table.find_one(filename=os.path.abspath(filename))
+    if checkpoint is None:
+        return 0, 0
+    if (checkpoint["file_size"], checkpoint["file_mtime"]) != file_identity(filename):
+        print(f"Ignoring the checkpoint of {filename}: the file has changed since")
+        return 0, 0
+    return checkpoint["byte_offset"], checkpoint["row_number"]
+
+
+def file_identity(filename):
+    """
+    Returns the size and modification time, in nanoseconds, of a file.
+    """
+    stat = os.stat(filename)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def save_checkpoint(filename, byte_offset, row_number):
+    """
+    Records how far into a file a load has committed.
+    """
+    file_size, file_mtime = file_identity(filename)
+    checkpoint = {
+        "filename": os.path.abspath(filename),
+        "byte_offset": byte_offset,
+        "row_number": row_number,
+        "file_size": file_size,
+        "file_mtime": file_mtime,
+    }
+    if not main.db[CHECKPOINT_TABLE].update(**checkpoint, columns=["filename"]):
+        main.db[CHECKPOINT_TABLE].insert(**checkpoint)
+
+
+def clear_checkpoint(filename):
+    """
+    Removes the checkpoint for a file once its load has finished.
+    """
+    main.db[CHECKPOINT_TABLE].delete(filename=os.path.abspath(filename))
+
+
+def stream_status_updates(filename, batch_size=main.BATCH_SIZE, resume=True, user_ids=None,
+                          rejects=None):
+    """
+    Streams a CSV file with status update data into the database, committing every batch_size
+    rows together with a checkpoint of the last committed byte offset and row number.
+    If a previous load of the same file was interrupted it resumes from that checkpoint,
+    unless resume is False. Duplicate status_ids and statuses of unknown users are reported
+    and skipped; user_ids may be a preloaded set of known users (see main.load_user_ids).
+    With rejects, rejected statuses are written to that report file instead of printed; a
+    resumed load adds to the report of the interrupted one.
+    Returns a summary dict, or False if the file could not be loaded.
+    """
+
+    def write_batch(table, statuses):
+        added, duplicates, orphans = main.add_status_batch(table, statuses, user_ids)
+        counts = {"loaded": added, "duplicates": len(duplicates), "orphans": len(orphans)}
+        return counts, duplicates, orphans
+
+    load = {
+        "summary": {"loaded": 0, "duplicates": 0, "orphans": 0},
+        "write_batch": write_batch,
+        "batch_size": batch_size,
+        "rejects": rejects,
+        "invalidate": False,
+    }
+    return stream_statuses(filename, load, resume)
+
+
+def upsert_status_updates(filename, batch_size=main.BATCH_SIZE, resume=True, user_ids=None,
+                          rejects=None):
+    """
+    Streams a CSV file with status update data into the database like stream_status_updates,
+    but existing statuses are updated instead of rejected as duplicates.
+    Returns a summary dict, or False if the file could not be loaded.
+    """
+
+    def write_batch(table, statuses):
+        statuses, orphans = main.split_orphans(statuses, user_ids)
+        counts = dict(zip(["inserted", "updated", "unchanged"],
+                          main.upsert_batch(table, statuses, "status_id")))
+        return {**counts, "orphans": len(orphans)}, [], orphans
+
+    main.ensure_indexes(main.db)
+    load = {
+        "summary": {"inserted": 0, "updated": 0, "unchanged": 0, "orphans": 0},
+        "write_batch": write_batch,
+        "batch_size": batch_size,
+        "rejects": rejects,
+        "invalidate": True,
+    }
+    return stream_statuses(filename, load, resume)
+
+
+def stream_statuses(filename, load, resume=True):
+    """
+    Streams a status CSV file in batches of load["batch_size"] rows, writing each batch with
+    load["write_batch"], which returns the batch's counts, duplicates and orphans.
+    load["summary"] holds the counts the summary starts from; with load["rejects"], the
+    summary includes the report summary.
+    Returns a summary dict, or False if the file could not be loaded.
+    """
+    try:
+        checkpoint = get_checkpoint(filename)
+        offset, row_number = checkpoint if resume else (0, 0)
+        if row_number:
+            print(f"Resuming {filename} after row {row_number}")
+        table = main.ensure_columns(main.STATUS_TABLE, main.TABLE_COLUMNS[main.STATUS_TABLE])
+        summary = {**load["summary"], "batches": 0}
+        with rejection_report(load["rejects"], "a" if row_number else "w") as report:
+            for batch in chunked(loaders.read_csv_rows(filename, offset, main.STATUS_FIELDS),
+                                 load["batch_size"]):
+                row_number += len(batch)
+                counts = commit_status_batch(table, batch, load, report, (filename, row_number))
+                summary["batches"] += 1
+                for name, count in counts.items():
+                    summary[name] += count
+            if report is not None:
+                summary.update(report_summary(report))
+        clear_checkpoint(filename)
+        summary["rows"] = row_number
+        return summary
+    except (FileNotFoundError, UnicodeDecodeError) as e:
+        print(f"An error occurred while loading statuses: {e}")
+        return False
+
+
+def commit_status_batch(table, batch, load, report, checkpoint):
+    """
+    Writes a batch of (row, end_offset) pairs from read_csv_rows with load["write_batch"]
+    and saves the checkpoint, a (filename, row_number) pair, in the same transaction.
+    With load["invalidate"], the batch's statuses are then dropped from the status cache.
+    Returns the batch's counts.
+    """
+    columns = list(main.STATUS_FIELDS.values())
+    statuses = [dict(zip(columns, row)) for row, _ in batch if all(row)]
+    with main.db.transaction():
+        counts, duplicates, orphans = load["write_batch"](table, statuses)
+        save_checkpoint(checkpoint[0], batch[-1][1], checkpoint[1])
+    # Rejections are reported once the batch is committed, so a resume does not repeat them
+    main.report_rejected_statuses(duplicates, orphans, report)
+    for row, _ in batch:
+        if not all(row):
+            reject(report, "missing_fields", dict(zip(columns, row)))
+    if load["invalidate"]:
+        for status in statuses:
+            main.invalidate_status(status["status_id"])
+    return counts
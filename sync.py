@@ -0,0 +1,127 @@
+"""
+Delta sync of the user table with a full user CSV file: only users added, changed or
+removed since the last sync are written
+"""
+
+import csv
+import hashlib
+from peewee import chunked
+from rejections import rejection_report, report_summary
+import loaders
+import main
+
+
+def fingerprint(user):
+    """
+    Returns a hash of every column of a user row, to detect changed rows.
+    """
+    values = "\x1f".join(user[column] for column in main.USER_FIELDS.values())
+    return hashlib.sha1(values.encode("utf-8")).hexdigest()
+
+
+def sync_users(filename, batch_size=main.BATCH_SIZE, rejects=None):
+    """
+    Synchronises the user table with a full user CSV file, writing only the users added,
+    changed or removed since the last sync. A fingerprint of every synced user is kept in
+    UserFingerprint; users whose fingerprint is unchanged are not written. Users synced
+    before but missing from the file are deleted with their statuses.
+    Rows failing main.validate_users are reported as rejected and left alone; their users
+    still count as present, so they are never removed. A file without a required column or
+    without any user rows removes nothing. With rejects, invalid rows are written to that
+    report file instead of printed, and the summary includes the report summary.
+    Returns a summary dict, or False if the file could not be loaded.
+    """
+    try:
+        with open(filename, encoding="utf-8", newline="") as csvfile, \
+                rejection_report(rejects) as report:
+            rows = loaders.csv_tuples(csv.reader(csvfile), main.USER_FIELDS)
+            main.ensure_indexes(main.db)
+            # user_ids seen in this file, in a temporary table so removals are found in SQL
+            main.db.query("CREATE TEMP TABLE IF NOT EXISTS sync_seen (user_id TEXT PRIMARY KEY)")
+            main.db.query("DELETE FROM sync_seen")
+            summary = {"added": 0, "changed": 0, "unchanged": 0, "rejected": 0, "removed": 0}
+            seen = 0
+            for batch in chunked(rows, batch_size):
+                for name, count in sync_rows(batch, report).items():
+                    summary[name] += count
+                seen += len(batch)
+            if not seen:
+                print(f"No users found in {filename}; no synced users were removed")
+                return False
+            summary["removed"] = remove_unseen_users()
+            if report is not None:
+                return {**summary, **report_summary(report)}
+            return summary
+    except (FileNotFoundError, KeyError) as e:
+        print(f"An error occurred while syncing users: {e}")
+        return False
+
+
+def sync_rows(batch, report=None):
+    """
+    Validates a batch of user tuples, reports the invalid ones and syncs the others.
+    Every user_id in the batch counts as seen. Returns the batch's counts.
+    """
+    columns = list(main.USER_FIELDS.values())
+    key = columns.index("user_id")
+    valid, rejected = main.validate_users(batch, columns)
+    main.report_invalid_users(rejected, columns, report)
+    added, changed, unchanged = sync_batch(
+        {row[key] for row in batch if row[key]}, [dict(zip(columns, row)) for row in valid]
+    )
+    return {"added": added, "changed": changed, "unchanged": unchanged, "rejected": len(rejected)}
+
+
+def sync_batch(user_ids, rows):
+    """
+    Records a batch's user_ids as seen and writes the rows whose fingerprint is new or
+    different. A user_id repeated in the batch keeps its last row.
+    Returns the number of users added, changed and unchanged.
+    """
+    users = main.db[main.USER_TABLE].model_class
+    fingerprints = main.db[main.FINGERPRINT_TABLE].model_class
+    latest = {row["user_id"]: row for row in rows}
+    hashes = {user_id: fingerprint(row) for user_id, row in latest.items()}
+    stored = {}
+    for ids_chunk in chunked(list(latest), loaders.ROWS_PER_INSERT):
+        stored.update(
+            fingerprints.select(fingerprints.user_id, fingerprints.fingerprint)
+            .where(fingerprints.user_id.in_(ids_chunk))
+            .tuples()
+        )
+    added = [user_id for user_id in latest if user_id not in stored]
+    changed = [user_id for user_id in latest
+               if user_id in stored and stored[user_id] != hashes[user_id]]
+    with main.db.transaction():
+        for ids_chunk in chunked(list(user_ids), loaders.ROWS_PER_INSERT):
+            placeholders = ", ".join(["(?)"] * len(ids_chunk))
+            main.db.query(f"INSERT OR IGNORE INTO sync_seen (user_id) VALUES {placeholders}",
+                          ids_chunk)
+        loaders.write_upserts(users, [latest[user_id] for user_id in added + changed], "user_id")
+        loaders.write_upserts(
+            fingerprints,
+            [{"user_id": user_id, "fingerprint": hashes[user_id]} for user_id in added + changed],
+            "user_id",
+        )
+    main.invalidate_users(set(changed))
+    return len(added), len(changed), len(latest) - len(added) - len(changed)
+
+
+def remove_unseen_users():
+    """
+    Deletes the synced users missing from sync_seen, with their statuses and fingerprints,
+    then drops sync_seen. Returns the number of users removed.
+    """
+    fingerprints = main.db[main.FINGERPRINT_TABLE].model_class
+    removed = [
+        user_id for (user_id,) in main.db.query(
+            f'SELECT user_id FROM "{main.FINGERPRINT_TABLE}" '
+            "WHERE user_id NOT IN (SELECT user_id FROM sync_seen)"
+        ).fetchall()
+    ]
+    with main.db.transaction():
+        main.delete_users(removed)
+        for ids_chunk in chunked(removed, loaders.ROWS_PER_INSERT):
+            fingerprints.delete().where(fingerprints.user_id.in_(ids_chunk)).execute()
+    main.db.query("DROP TABLE sync_seen")
+    return len(removed)
@@ -0,0 +1,115 @@
+"""
+Unittests for async_api.py
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import async_api
+import main
+import socialnetwork_model
+
+
+class TestAsyncApi(unittest.TestCase):
+    """
+    Testing class for async_api.py, against a database file shared with the database thread
+    """
+
+    def setUp(self):
+        """
+        point main at a fresh database file
+        """
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.database = os.path.join(self.directory.name, "async.db")
+        main.db = main.init_database(self.database)
+
+    def tearDown(self):
+        """
+        stop the database thread and remove the database
+        """
+        async_api.close_executor()
+        socialnetwork_model.close_ds(self.database)
+        self.directory.cleanup()
+
+    @patch('builtins.print')
+    def test_crud(self, mock_print):
+        """
+        test every operation through the async facade
+        """
+        user = {"user_id": "u1", "user_email": "a@uw.edu",
+                "user_name": "Ann", "user_last_name": "Lee"}
+
+        async def scenario():
+            self.assertTrue(await async_api.add_user(user))
+            self.assertFalse(await async_api.add_user(user))
+            self.assertTrue(await async_api.update_user("u1", "b@uw.edu", "Ann", "Lee"))
+            self.assertEqual((await async_api.search_user("u1"))["user_email"], "b@uw.edu")
+            self.assertTrue(await async_api.add_status("s1", "u1", "hello"))
+            self.assertTrue(await async_api.update_status("s1", "u1", "bye"))
+            self.assertEqual((await async_api.search_status("s1"))["status_text"], "bye")
+            self.assertTrue(await async_api.delete_status("s1"))
+            self.assertTrue(await async_api.delete_user("u1"))
+            self.assertIsNone(await async_api.search_user("u1"))
+
+        asyncio.run(scenario())
+        mock_print.assert_any_call("User with ID u1 already exists.")
+
+    @patch('builtins.print')
+    def test_group_commit(self, _):
+        """
+        test that concurrent writes are committed in fewer groups than calls
+        """
+        async def scenario():
+            return await asyncio.gather(*[
+                async_api.add_user({"user_id": f"u{number}", "user_email": "a@uw.edu",
+                                    "user_name": "Ann", "user_last_name": "Lee"})
+                for number in range(200)
+            ])
+
+        self.assertTrue(all(asyncio.run(scenario())))
+        stats = async_api.queue_stats()
+        self.assertEqual(len(main.db[main.USER_TABLE]), 200)
+        self.assertEqual(stats["grouped_writes"], 200)
+        self.assertLess(stats["groups"], 200)
+        self.assertEqual(stats["depth"], 0)
+        self.assertEqual(stats["submitted"], stats["completed"])
+
+    def test_write_error(self):
+        """
+        test that a failing write fails only its own call
+        """
+        def fail():
+            raise ValueError("bad write")
+
+        async def scenario():
+            return await asyncio.gather(
+                async_api.submit(fail, write=True),
+                async_api.submit(lambda: True, write=True),
+                return_exceptions=True,
+            )
+
+        error, result = asyncio.run(scenario())
+        self.assertIsInstance(error, ValueError)
+        self.assertTrue(result)
+
+    def test_bounded_queue(self):
+        """
+        test that callers wait for room when the queue is full
+        """
+        executor = async_api.create_executor(maxsize=2)
+
+        async def scenario():
+            return await asyncio.gather(*[
+                async_api.submit(lambda number=number: number, executor=executor)
+                for number in range(20)
+            ])
+
+        self.assertEqual(asyncio.run(scenario()), list(range(20)))
+        self.assertLessEqual(async_api.queue_stats(executor)["max_depth"], 2)
+        async_api.shutdown_executor(executor)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Unittests for benchmark.py
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import benchmark
+import main
+import socialnetwork_model
+import streaming
+
+
+class TestBenchmark(unittest.TestCase):
+    """
+    Testing class for benchmark.py
+    """
+
+    def setUp(self):
+        """
+        remember the database main was using
+        """
+        self.db = main.db
+
+    def tearDown(self):
+        """
+        point main back at its database
+        """
+        main.db = self.db
+
+    def test_run_benchmarks(self):
+        """
+        test a small run covers every operation with real timings
+        """
+        report = benchmark.run_benchmarks([50], operations=10)
+        operations = [result["operation"] for result in report["results"]]
+        self.assertEqual(operations, [
+            "decode_dicts", "decode_tuples",
+            "load_users", "load_status_updates", "bulk_load_users", "stream_status_updates",
+            "add_user", "search_user", "add_status", "post_status",
+            "update_status", "delete_user", "delete_status_without_user",
+        ])
+        self.assertTrue(all(result["seconds"] > 0 for result in report["results"]))
+
+    def test_generated_statuses_load(self):
+        """
+        test that generated statuses belong to generated users, so the batched loaders store
+        every row and the timed status updates succeed
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            users_file = os.path.join(directory, "users.csv")
+            statuses_file = os.path.join(directory, "statuses.csv")
+            benchmark.generate_users(users_file, 50, seed=3)
+            benchmark.generate_statuses(statuses_file, 50, 50, seed=3)
+            user_ids = benchmark.read_user_ids(users_file)
+            database = os.path.join(directory, "batched.db")
+            benchmark.use_database(database)
+            try:
+                with patch('builtins.print'):
+                    main.bulk_load_users(users_file)
+                    summary = streaming.stream_status_updates(statuses_file,
+                                                              user_ids=set(user_ids))
+                    updated = [main.update_status(f"status{number}", user_ids[number], "updated")
+                               for number in range(10)]
+                self.assertEqual(len(main.db[main.USER_TABLE]), 50)
+                self.assertEqual(summary["orphans"], 0)
+                self.assertEqual(len(main.db[main.STATUS_TABLE]), 50)
+                self.assertEqual(updated, [True] * 10)
+            finally:
+                socialnetwork_model.close_ds(database)
+
+    def test_decode_memory(self):
+        """
+        test that decoding rows as tuples peaks lower than as dicts, at a scale where the
+        rows rather than fixed overhead dominate the allocation
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "users.csv")
+            benchmark.generate_users(filename, 5000)
+            dicts = benchmark.timed(5000, "decode_dicts", 5000,
+                                    lambda: benchmark.decode_dicts(filename), True)
+            tuples = benchmark.timed(5000, "decode_tuples", 5000,
+                                     lambda: benchmark.decode_tuples(filename), True)
+        self.assertLess(tuples["peak_bytes"], dicts["peak_bytes"] * 0.9)
+
+    def test_compare(self):
+        """
+        test comparing a report against a baseline
+        """
+        baseline = {"results": [{"scale": 10, "operation": "add_user", "seconds": 2.0}]}
+        report = {"results": [
+            {"scale": 10, "operation": "add_user", "seconds": 1.0},
+            {"scale": 10, "operation": "search_user", "seconds": 1.0},
+        ]}
+        self.assertEqual(
+            benchmark.compare(report, baseline),
+            [{"scale": 10, "operation": "add_user", "ratio": 0.5}],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
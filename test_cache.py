@@ -0,0 +1,66 @@
+"""
+Unittests for cache.py
+"""
+
+import unittest
+from unittest.mock import MagicMock
+import cache
+
+
+class TestCache(unittest.TestCase):
+    """
+    Testing class for cache.py
+    """
+
+    def setUp(self):
+        """
+        create a small cache
+        """
+        self.cache = cache.create_cache(2)
+        self.loader = MagicMock(side_effect=lambda key: {"key": key})
+
+    def test_cache_lookup_hit_and_miss(self):
+        """
+        test that a second lookup is served from the cache
+        """
+        self.assertEqual(cache.cache_lookup(self.cache, "a", self.loader), {"key": "a"})
+        self.assertEqual(cache.cache_lookup(self.cache, "a", self.loader), {"key": "a"})
+        self.loader.assert_called_once_with("a")
+        self.assertEqual(
+            cache.cache_stats(self.cache), {"size": 1, "maxsize": 2, "hits": 1, "misses": 1}
+        )
+
+    def test_cache_lookup_evicts_least_recently_used(self):
+        """
+        test that the least recently used entry is evicted
+        """
+        cache.cache_lookup(self.cache, "a", self.loader)
+        cache.cache_lookup(self.cache, "b", self.loader)
+        cache.cache_lookup(self.cache, "a", self.loader)
+        cache.cache_lookup(self.cache, "c", self.loader)
+        self.assertEqual(list(self.cache["entries"]), ["a", "c"])
+
+    def test_cache_lookup_none_not_cached(self):
+        """
+        test that missing rows are not cached
+        """
+        loader = MagicMock(return_value=None)
+        cache.cache_lookup(self.cache, "a", loader)
+        cache.cache_lookup(self.cache, "a", loader)
+        self.assertEqual(loader.call_count, 2)
+
+    def test_cache_invalidate(self):
+        """
+        test invalidating by key and by predicate
+        """
+        cache.cache_lookup(self.cache, "a", self.loader)
+        cache.cache_lookup(self.cache, "b", self.loader)
+        cache.cache_invalidate(self.cache, "a")
+        cache.cache_invalidate(self.cache, "missing")
+        self.assertEqual(list(self.cache["entries"]), ["b"])
+        cache.cache_invalidate_where(self.cache, lambda value: value["key"] == "b")
+        self.assertEqual(cache.cache_stats(self.cache)["size"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+"""
+Unittests for export.py
+"""
+
+import gzip
+import json
+import os
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import patch
+from playhouse.dataset import DataSet
+import export
+import main
+
+
+class TestExport(unittest.TestCase):
+    """
+    Testing class for export.py
+    """
+
+    def setUp(self):
+        """
+        set up an in-memory database with users and statuses, and an output directory
+        """
+        self.db = DataSet("sqlite:///:memory:")
+        main.db = self.db
+        for number in range(25):
+            self.db[main.USER_TABLE].insert(
+                user_id=f"u{number}", user_email=f"u{number}@uw.edu",
+                user_name="Ann", user_last_name="Lee, Jr." if number % 2 else "Lee",
+            )
+            self.db[main.STATUS_TABLE].insert(
+                status_id=f"s{number}", user_id=f"u{number}", status_text=f'says "hi"\nto {number}'
+            )
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+
+    def tearDown(self):
+        """
+        remove the output directory and close the database
+        """
+        self.directory.cleanup()
+        self.db.close()
+
+    def test_csv_round_trip(self):
+        """
+        test that a CSV export loads back into an empty database unchanged
+        """
+        summaries = export.export_database(self.directory.name, fetch_size=7)
+        self.assertEqual([(summary["table"], summary["rows"]) for summary in summaries],
+                         [("users", 25), ("statuses", 25)])
+
+        users = list(self.db[main.USER_TABLE].all())
+        statuses = list(self.db[main.STATUS_TABLE].all())
+        main.db = DataSet("sqlite:///:memory:")
+        with patch('builtins.print'):
+            self.assertTrue(main.load_users(os.path.join(self.directory.name, "users.csv")))
+            self.assertTrue(
+                main.load_status_updates(os.path.join(self.directory.name, "statuses.csv"))
+            )
+        self.assertEqual(list(main.db[main.USER_TABLE].all()), users)
+        self.assertEqual(list(main.db[main.STATUS_TABLE].all()), statuses)
+        main.db.close()
+
+    def test_gzip_jsonl(self):
+        """
+        test a gzip-compressed JSON Lines export
+        """
+        filename = os.path.join(self.directory.name, "statuses.jsonl.gz")
+        summary = export.export_table("statuses", filename)
+
+        self.assertEqual(summary["rows"], 25)
+        with gzip.open(filename, "rt", encoding="utf-8") as jsonl:
+            rows = [json.loads(line) for line in jsonl]
+        self.assertEqual(
+            rows[3], {"STATUS_ID": "s3", "USER_ID": "u3", "STATUS_TEXT": 'says "hi"\nto 3'}
+        )
+
+    def test_export_format(self):
+        """
+        test that the format comes from the extension
+        """
+        self.assertEqual(export.export_format("users.csv.gz"), "csv")
+        self.assertEqual(export.export_format("users.jsonl"), "jsonl")
+        with self.assertRaises(ValueError):
+            export.export_format("users.txt")
+
+    def test_colz_round_trip(self):
+        """
+        test that a colz export reads back in row groups with the same values
+        """
+        filename = os.path.join(self.directory.name, "statuses.colz")
+        summary = export.export_table("statuses", filename, row_group_size=10)
+        self.assertEqual(summary["rows"], 25)
+
+        groups = list(export.read_colz(filename))
+        self.assertEqual([len(group["STATUS_ID"]) for group in groups], [10, 10, 5])
+        self.assertEqual(groups[0]["STATUS_TEXT"][3], 'says "hi"\nto 3')
+        rows = [
+            tuple(values)
+            for group in groups
+            for values in zip(group["STATUS_ID"], group["USER_ID"], group["STATUS_TEXT"])
+        ]
+        columns = ["status_id", "user_id", "status_text"]
+        self.assertEqual(rows, list(export.stream_rows(main.STATUS_TABLE, columns)))
+        self.assertEqual(list(export.read_colz(filename, ["USER_ID"]))[2],
+                         {"USER_ID": [f"u{n}" for n in range(20, 25)]})
+
+    def test_colz_rejects_other_archives(self):
+        """
+        test that reading a zip that is not a colz archive fails clearly
+        """
+        filename = os.path.join(self.directory.name, "other.colz")
+        with zipfile.ZipFile(filename, "w") as archive:
+            archive.writestr("manifest.json", json.dumps({"format": "other"}))
+        with self.assertRaises(ValueError):
+            list(export.read_colz(filename))
+
+    def test_columnar_export(self):
+        """
+        test that the columnar format falls back to colz without pyarrow and ignores gzip
+        """
+        summaries = export.export_database(self.directory.name, ["users"], "columnar",
+                                           compress=True)
+        expected = "users.parquet" if export.pyarrow else "users.colz"
+        self.assertEqual(summaries[0]["filename"], os.path.join(self.directory.name, expected))
+        self.assertGreater(summaries[0]["bytes"], 0)
+        with self.assertRaises(ValueError):
+            export.export_format("users.colz.gz")
+
+    @unittest.skipUnless(export.pyarrow, "pyarrow is not installed")
+    def test_parquet(self):
+        """
+        test a Parquet export with several row groups
+        """
+        filename = os.path.join(self.directory.name, "users.parquet")
+        export.export_table("users", filename, row_group_size=10)
+        parquet_file = export.pyarrow.parquet.ParquetFile(filename)
+        self.assertEqual(parquet_file.metadata.num_row_groups, 3)
+        self.assertEqual(parquet_file.read().column("USER_ID").to_pylist()[:2], ["u0", "u1"])
+
+    def test_parquet_needs_pyarrow(self):
+        """
+        test that Parquet export without pyarrow fails with a clear error
+        """
+        with patch('export.pyarrow', None), self.assertRaises(ImportError):
+            export.write_parquet(
+                os.path.join(self.directory.name, "users.parquet"), ["USER_ID"], []
+            )
+
+    def test_main_export(self):
+        """
+        test the command line entry point reports every table
+        """
+        database = os.path.join(self.directory.name, "export.db")
+        with patch('builtins.print') as mock_print, \
+                patch('main.init_database', return_value=self.db):
+            summaries = export.main_export([
+                "--database", database, "--output-dir", self.directory.name,
+                "--format", "jsonl", "--gzip",
+            ])
+        self.assertEqual([summary["filename"] for summary in summaries], [
+            os.path.join(self.directory.name, "users.jsonl.gz"),
+            os.path.join(self.directory.name, "statuses.jsonl.gz"),
+        ])
+        self.assertEqual(mock_print.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Unittests for loaders.py
+"""
+
+import csv
+import io
+import os
+import unittest
+import loaders
+import main
+from csv_fixtures import write_csv
+
+
+class TestLoaders(unittest.TestCase):
+    """Unit tests for CSV row decoding."""
+
+    def test_csv_tuples(self):
+        """Test that rows come back as tuples in field order and short rows are padded."""
+        reader = csv.reader(io.StringIO(
+            "USER_ID,NAME,LASTNAME,EMAIL\n"
+            "u1,Ann,Lee,ann@uw.edu\n"
+            "\n"
+            "u3,Cat\n"
+        ))
+        rows = list(loaders.csv_tuples(reader, main.USER_FIELDS))
+        self.assertEqual(rows, [("u1", "ann@uw.edu", "Ann", "Lee"), ("u3", "", "Cat", "")])
+
+    def test_csv_tuples_missing_column(self):
+        """Test that a header without a required column raises KeyError."""
+        reader = csv.reader(io.StringIO("USER_ID,NAME\nu1,Ann\n"))
+        with self.assertRaises(KeyError):
+            list(loaders.csv_tuples(reader, main.USER_FIELDS))
+
+    def test_read_csv_rows_offsets(self):
+        """Test that offsets point past each row and can be used to resume."""
+        filename = write_csv(
+            "STATUS_ID,USER_ID,STATUS_TEXT\n"
+            "s1,u1,one\n"
+            "s2,u1,\"two, with comma\"\n"
+            "s3,u2,three\n"
+        )
+        try:
+            rows = list(loaders.read_csv_rows(filename))
+            resumed = list(loaders.read_csv_rows(filename, rows[1][1]))
+            self.assertEqual(rows[-1][1], os.path.getsize(filename))
+        finally:
+            os.remove(filename)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1][0]["STATUS_TEXT"], "two, with comma")
+        self.assertEqual([row["STATUS_ID"] for row, _ in resumed], ["s3"])
+
+    def test_read_csv_rows_fields(self):
+        """Test that read_csv_rows yields tuples of the selected fields with their offsets."""
+        filename = write_csv("STATUS_ID,USER_ID,STATUS_TEXT\ns1,u1,hi\ns2,u2\n")
+        try:
+            rows = list(loaders.read_csv_rows(filename, fields=["USER_ID", "STATUS_TEXT"]))
+            self.assertEqual(rows[-1][1], os.path.getsize(filename))
+        finally:
+            os.remove(filename)
+        self.assertEqual([row for row, _ in rows], [("u1", "hi"), ("u2", "")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,16 @@
 """Unittests for main.py"""
+import os
 import unittest
 from unittest.mock import patch, MagicMock
 from peewee import IntegrityError
+from playhouse.dataset import DataSet
+import loaders
 import main
+import rejections
+import streaming
+import sync
 from main import USER_TABLE, STATUS_TABLE
+from csv_fixtures import write_csv
 
 USER_TABLE = "UserModel"
 STATUS_TABLE = "StatusModel"
@@ -24,9 +31,11 @@ class TestInitDatabase(unittest.TestCase):
         self.mock_status_table.columns = ["id"]
 
         # Set up the mock database to return the mock tables
+        self.mock_fingerprint_table = MagicMock()
         self.mock_db.__getitem__.side_effect = lambda key: {
             USER_TABLE: self.mock_user_table,
-            STATUS_TABLE: self.mock_status_table
+            STATUS_TABLE: self.mock_status_table,
+            main.FINGERPRINT_TABLE: self.mock_fingerprint_table,
         }.get(key, None)
 
         # Mock get_ds to return our mock database
@@ -44,8 +53,42 @@ class TestInitDatabase(unittest.TestCase):
         self.assertIsNotNone(db.get(STATUS_TABLE), "STATUS_TABLE is not correctly mocked")
 
         # Verify that create_index was called correctly
-        self.mock_user_table.create_index.assert_called_once_with(["user_id"], unique=True)
-        self.mock_status_table.create_index.assert_called_once_with(["status_id"], unique=True)
+        self.mock_user_table.create_index.assert_any_call(["user_id"], unique=True)
+        self.mock_db.query.assert_any_call(
+            'CREATE INDEX "usermodel_user_name_collate_nocase_user_id" ON "UserModel" '
+            '("user_name" COLLATE NOCASE, "user_id")'
+        )
+        self.mock_status_table.create_index.assert_any_call(["status_id"], unique=True)
+        self.mock_status_table.create_index.assert_any_call(["user_id", "status_id"], unique=False)
+
+    def test_init_database_real(self):
+        """
+        Test that init_database creates the declared indexes on a new database once.
+        """
+        database = DataSet("sqlite:///:memory:")
+        main.db = database
+        with patch('main.get_ds', return_value=database):
+            main.init_database()
+            main.init_database()
+
+        report = main.index_report()
+        self.assertEqual(report[USER_TABLE]["missing"], [])
+        self.assertEqual(report[STATUS_TABLE]["missing"], [])
+        self.assertEqual(
+            sorted((index["columns"], index["unique"]) for index in report[STATUS_TABLE]["present"]),
+            [(["status_id"], True), (["user_id", "status_id"], False)],
+        )
+        plan = database.query(
+            f'EXPLAIN QUERY PLAN SELECT * FROM "{STATUS_TABLE}" WHERE user_id = ?', ("u1",)
+        ).fetchall()
+        self.assertIn("USING INDEX", plan[0][-1])
+        database.close()
+
+    def tearDown(self):
+        """
+        Stop the get_ds patch.
+        """
+        patch.stopall()
 
 
 class TestMainUserFunctions(unittest.TestCase):
@@ -221,46 +264,48 @@ class TestMainUserFunctions(unittest.TestCase):
 
     def test_update_user_success(self):
         """
-        Test successful update of a user's details.
+        Test successful update of a user's details with one conditional UPDATE and no lookup.
         """
-        user_id = "SC"
-        new_email = "newemail@uw.edu"
-        new_user_name = "Sesame"
-        new_user_last_name = "Chan"
-
-        mock_user_table = MagicMock()
         mock_db = MagicMock()
-        mock_db[USER_TABLE] = mock_user_table
-        mock_db.transaction.return_value.__enter__.return_value = mock_db
+        mock_db.__getitem__.return_value.update.return_value = 1
 
-        with patch('main.search_user') as mock_search_user:
-            mock_search_user.return_value = MagicMock()
-            result = main.update_user(mock_db, user_id, new_email, new_user_name, new_user_last_name)
-            self.assertTrue(result)
-            mock_db.transaction.assert_called_once()
+        with patch('main.find_user') as mock_find_user:
+            result = main.update_user(mock_db, "SC", "newemail@uw.edu", "Sesame", "Chan")
+
+        self.assertTrue(result)
+        mock_db.transaction.assert_called_once()
+        mock_db[USER_TABLE].update.assert_called_once_with(
+            user_id="SC", user_email="newemail@uw.edu", user_name="Sesame",
+            user_last_name="Chan", columns=["user_id"],
+        )
+        mock_db[USER_TABLE].find_one.assert_not_called()
+        mock_find_user.assert_not_called()
 
-    @patch('main.search_user')
     @patch('builtins.print')  # Mock the built-in print function
-    def test_update_user_not_found(self, mock_print, mock_search_user):
+    def test_update_user_not_found(self, mock_print):
         """
-        Test that update_user prints a message and returns False if user_to_modify is not found.
+        Test that update_user prints a message and returns False if no row was updated.
         """
-        # Set up
-        mock_search_function = MagicMock(return_value=None)
-        mock_search_user.return_value = mock_search_function
-
-        # Call the function
-        result = main.update_user(
-            db=MagicMock(),  # Mock the db parameter
-            user_id='user1',
-            email='user1@example.com',
-            user_name='User',
-            user_last_name='One'
-        )
+        mock_db = MagicMock()
+        mock_db[USER_TABLE].update.return_value = 0
+
+        with patch('main.find_user') as mock_find_user:
+            result = main.update_user(
+                db=mock_db,  # Mock the db parameter
+                user_id='user1',
+                email='user1@example.com',
+                user_name='User',
+                user_last_name='One'
+            )
 
-        # Assertions
         self.assertFalse(result)
         mock_print.assert_called_once_with("Nothing to update.")
+        mock_db[USER_TABLE].update.assert_called_once_with(
+            user_id='user1', user_email='user1@example.com', user_name='User',
+            user_last_name='One', columns=["user_id"],
+        )
+        mock_db[USER_TABLE].find_one.assert_not_called()
+        mock_find_user.assert_not_called()
 
 
 class TestDeleteUser(unittest.TestCase):
@@ -286,26 +331,18 @@ class TestDeleteUser(unittest.TestCase):
         Test successful deletion of user and associated statuses.
         """
         user_id = "SC"
-        user_mock = {"id": "user_db_id"}
-        status_mock = [{"status_id": "status1"}, {"status_id": "status2"}]
-
-        # Mock the database calls
-        self.mock_status_table.find.return_value = status_mock
-        self.mock_status_table.find_one.side_effect = [
-            {"id": "status1_db_id"},
-            {"id": "status2_db_id"},
-        ]
-        self.mock_user_table.find_one.return_value = user_mock
+        self.mock_status_table.delete.return_value = 2
+        self.mock_user_table.delete.return_value = 1
 
         # Run the function
         result = main.delete_user(user_id)
 
         # Assertions
         self.assertTrue(result)
-        self.mock_status_table.find.assert_called_once_with(user_id=user_id)
-        self.mock_status_table.delete.assert_any_call(id="status1_db_id")
-        self.mock_status_table.delete.assert_any_call(id="status2_db_id")
-        self.mock_user_table.delete.assert_called_once_with(id="user_db_id")
+        self.mock_db.transaction.assert_called_once()
+        self.mock_status_table.delete.assert_called_once_with(user_id=user_id)
+        self.mock_user_table.delete.assert_called_once_with(user_id=user_id)
+        self.mock_status_table.find.assert_not_called()
 
     def test_delete_user_not_found(self):
         """
@@ -314,88 +351,78 @@ class TestDeleteUser(unittest.TestCase):
         user_id = "NC"
 
         # Mock the database calls
-        self.mock_user_table.find_one.return_value = None
+        self.mock_user_table.delete.return_value = 0
 
         with patch('builtins.print') as mock_print:
             result = main.delete_user(user_id)
 
             # Assertions
             self.assertFalse(result)
-            self.mock_user_table.find_one.assert_called_once_with(user_id=user_id)
+            self.mock_user_table.delete.assert_called_once_with(user_id=user_id)
             mock_print.assert_called_once_with(f"User record not found for user_id: {user_id}")
 
-    def test_delete_user_status_not_found(self):
+    def test_delete_user_overall_exception(self):
         """
-        Test deletion when one or more statuses are not found.
+        Test overall exception handling during the deletion process.
         """
         user_id = "SC"
-        user_mock = {"id": "user_db_id"}
-        status_mock = [{"status_id": "status1"}, {"status_id": "status2"}]
 
-        # Mock the database calls
-        self.mock_status_table.find.return_value = status_mock
-        self.mock_status_table.find_one.side_effect = [
-            {"id": "status1_db_id"},
-            None,  # Simulate status2 not being found
-        ]
-        self.mock_user_table.find_one.return_value = user_mock
+        # Mock the database calls to raise an exception
+        self.mock_status_table.delete.side_effect = Exception("Unexpected database error")
 
         with patch('builtins.print') as mock_print:
             result = main.delete_user(user_id)
 
             # Assertions
             self.assertFalse(result)
-            self.mock_status_table.find.assert_called_once_with(user_id=user_id)
-            self.mock_status_table.delete.assert_called_once_with(id="status1_db_id")
-            mock_print.assert_any_call("Status record not found for status_id: status2")
-            self.mock_user_table.delete.assert_called_once_with(id="user_db_id")
-
-    def test_delete_user_status_deletion_exception(self):
-        """
-        Test deletion when an exception occurs during status deletion.
-        """
-        user_id = "SC"
-        user_mock = {"id": "user_db_id"}
-        status_mock = [{"status_id": "status1"}, {"status_id": "status2"}]
+            self.mock_status_table.delete.assert_called_once_with(user_id=user_id)
+            self.mock_user_table.delete.assert_not_called()
+            mock_print.assert_called_once_with(
+                "An error occurred while deleting user: Unexpected database error"
+            )
 
-        # Mock the database calls
-        self.mock_status_table.find.return_value = status_mock
-        self.mock_status_table.find_one.side_effect = [
-            {"id": "status1_db_id"},
-            Exception("Database error")  # Simulate an exception during status2 deletion
-        ]
-        self.mock_user_table.find_one.return_value = user_mock
 
-        with patch('builtins.print') as mock_print:
-            result = main.delete_user(user_id)
+class TestDeleteUsers(unittest.TestCase):
+    """
+    Unit tests for the bulk delete_users function in main.py.
+    """
 
-            # Assertions
-            self.assertFalse(result)
-            self.mock_status_table.find.assert_called_once_with(user_id=user_id)
-            self.mock_status_table.delete.assert_called_once_with(id="status1_db_id")
-            mock_print.assert_any_call(
-                "Failed to delete status with status_id: status2. Error: Database error"
-            )
-            self.mock_user_table.delete.assert_called_once_with(id="user_db_id")
+    def setUp(self):
+        """
+        Set up an in-memory database with three users and their statuses.
+        """
+        self.db = DataSet("sqlite:///:memory:")
+        main.db = self.db
+        for number in range(3):
+            self.db[USER_TABLE].insert(user_id=f"u{number}", user_email="", user_name="", user_last_name="")
+            for status in range(2):
+                self.db[STATUS_TABLE].insert(status_id=f"s{number}-{status}", user_id=f"u{number}", status_text="")
 
-    def test_delete_user_overall_exception(self):
+    def tearDown(self):
         """
-        Test overall exception handling during the deletion process.
+        Close the database.
         """
-        user_id = "SC"
+        self.db.close()
 
-        # Mock the database calls to raise an exception
-        self.mock_status_table.find.side_effect = Exception("Unexpected database error")
+    def test_delete_users(self):
+        """
+        Test that users and their statuses are deleted in bulk.
+        """
+        with patch('main.ROWS_PER_INSERT', 1):
+            deleted = main.delete_users(["u0", "u2", "missing"])
 
-        with patch('builtins.print') as mock_print:
-            result = main.delete_user(user_id)
+        self.assertEqual(deleted, {"users": 2, "statuses": 4})
+        self.assertEqual([user["user_id"] for user in self.db[USER_TABLE].all()], ["u1"])
+        self.assertEqual(len(self.db[STATUS_TABLE]), 2)
 
-            # Assertions
-            self.assertFalse(result)
-            self.mock_status_table.find.assert_called_once_with(user_id=user_id)
-            mock_print.assert_called_once_with(
-                "An error occurred while deleting user: Unexpected database error"
-            )
+    def test_delete_user_cascade(self):
+        """
+        Test that delete_user removes only the user's statuses.
+        """
+        self.assertTrue(main.delete_user("u1"))
+        self.assertEqual(len(self.db[USER_TABLE]), 2)
+        self.assertIsNone(self.db[STATUS_TABLE].find_one(user_id="u1"))
+        self.assertEqual(len(self.db[STATUS_TABLE]), 4)
 
 
 class TestSearchUser(unittest.TestCase):
@@ -789,147 +816,92 @@ class TestUpdateStatusFunctions(unittest.TestCase):
 
     def setUp(self):
         """
-        Set up test environment.
+        Set up an in-memory database with two users and one status.
         """
-        self.mock_db = MagicMock()
-        self.mock_user_table = MagicMock()
-        self.mock_status_table = MagicMock()
-        self.mock_db.__getitem__.side_effect = {
-            USER_TABLE: self.mock_user_table,
-            STATUS_TABLE: self.mock_status_table
-        }.get
-        # Patch the db used in main with the mock
-        main.db = self.mock_db
+        self.db = DataSet("sqlite:///:memory:")
+        main.db = self.db
+        for user_id in ["user1", "user2"]:
+            self.db[USER_TABLE].insert(user_id=user_id, user_email="", user_name="", user_last_name="")
+        self.db[STATUS_TABLE].insert(status_id="status1", user_id="user1", status_text="Status")
+
+    def tearDown(self):
+        """
+        Close the database.
+        """
+        self.db.close()
 
     def test_update_status_success(self):
         """
         Test successful update of a status.
         """
-        # Setup
-        status_id = "status1"
-        user_id = "user1"
-        status_text = "Updated Status"
-
-        # Configure the mock return value
-        self.mock_user_table.find_one.return_value = {"user_id": user_id}
-        self.mock_status_table.find_one.return_value = {"status_id": status_id}
-        self.mock_status_table.update = MagicMock()
-
-        # Call the function
-        result = main.update_status(status_id, user_id, status_text)
+        with patch('main.find_user') as mock_find_user, patch('main.find_status') as mock_find_status:
+            result = main.update_status("status1", "user2", "Updated Status")
 
         # Assertions
         self.assertTrue(result)
-        self.mock_status_table.update.assert_called_once_with(
-            status_id=status_id,
-            user_id=user_id,
-            status_text=status_text,
-            columns=["status_id"]
-        )
+        mock_find_user.assert_not_called()
+        mock_find_status.assert_not_called()
+        status = self.db[STATUS_TABLE].find_one(status_id="status1")
+        self.assertEqual((status["user_id"], status["status_text"]), ("user2", "Updated Status"))
 
-    @patch('main.search_user')
-    def test_update_status_user_not_found(self, mock_search_user):
+    def test_update_status_user_not_found(self):
         """
         Test failure to update a status if the user is not found.
         """
-        # Setup
-        mock_search_function = MagicMock(return_value=None)
-        mock_search_user.return_value = mock_search_function
-
-        status_id = "status1"
-        user_id = "user1"
-        status_text = "Updated Status"
-
-        # Call the function
-        result = main.update_status(status_id, user_id, status_text)
+        result = main.update_status("status1", "nouser", "Updated Status")
 
         # Assertions
         self.assertFalse(result)
-        self.mock_status_table.update.assert_not_called()
+        self.assertEqual(self.db[STATUS_TABLE].find_one(status_id="status1")["status_text"], "Status")
 
     def test_update_status_status_not_found(self):
         """
         Test failure to update a status if the status_id is not found.
         """
-        # Setup
-        status_id = "status1"
-        user_id = "user1"
-        status_text = "Updated Status"
-
-        self.mock_user_table.find_one.return_value = {"user_id": user_id}
-        self.mock_status_table.find_one.return_value = None  # Status not found
-
-        # Call the function
-        result = main.update_status(status_id, user_id, status_text)
+        result = main.update_status("status2", "user1", "Updated Status")
 
         # Assertions
         self.assertFalse(result)
-        self.mock_status_table.update.assert_not_called()
+        self.assertEqual(len(self.db[STATUS_TABLE]), 1)
 
-    def test_update_status_transaction_error(self):
-        """
-        Test failure to update a status due to an exception during the transaction.
-        """
-        # Setup
-        status_id = "status1"
-        user_id = "user1"
-        status_text = "Updated Status"
-
-        self.mock_user_table.find_one.return_value = {"user_id": user_id}
-        self.mock_status_table.find_one.return_value = {"status_id": status_id}
-        self.mock_db.transaction.side_effect = Exception("Transaction Error")
-
-        # Call the function
-        result = main.update_status(status_id, user_id, status_text)
-
-        # Assertions
-        self.assertFalse(result)
-        self.mock_status_table.update.assert_not_called()
-
-    def test_update_status_exception_handling(self):
+    @patch('builtins.print')
+    def test_update_status_exception_handling(self, mock_print):
         """Test that an exception during the transaction is caught and handled."""
-        # Setup
-        status_id = "status1"
-        user_id = "user1"
-        status_text = "Updated Status"
-
-        # Mock the user and status exist
-        self.mock_user_table.find_one.return_value = {"user_id": user_id}
-        self.mock_status_table.find_one.return_value = {"status_id": status_id}
-        # Mock the update operation to raise an exception
-        self.mock_status_table.update.side_effect = Exception("Update Failed")
-
-        # Call the function
-        result = main.update_status(status_id, user_id, status_text)
+        with patch('main.status_update_query', side_effect=Exception("Update Failed")):
+            result = main.update_status("status1", "user1", "Updated Status")
 
         # Assertions
         self.assertFalse(result)
-        self.mock_status_table.update.assert_called_once_with(
-            status_id=status_id,
-            user_id=user_id,
-            status_text=status_text,
-            columns=["status_id"]
-        )
+        mock_print.assert_called_once_with("An error occurred during the transaction: Update Failed")
 
-    @patch('main.search_user')
-    def test_update_status_not_found(self, mock_search_user):
+    def test_update_statuses(self):
         """
-        Test failure to update a status if the user is not found.
+        Test applying many status changes in one transaction.
         """
-        # Setup
-        mock_search_function = MagicMock(return_value=None)
-        mock_search_user.return_value = mock_search_function
+        self.db[STATUS_TABLE].insert(status_id="status2", user_id="user2", status_text="Other")
+        summary = main.update_statuses(iter([
+            {"status_id": "status1", "user_id": "user1", "status_text": "one"},
+            {"status_id": "status2", "user_id": "nouser", "status_text": "two"},
+            {"status_id": "status3", "user_id": "user1", "status_text": "three"},
+        ]))
 
-        status_id = "status1"
-        user_id = "user1"
-        status_text = "Updated Status"
+        self.assertEqual(summary, {"updated": 1, "skipped": ["status2", "status3"]})
+        self.assertEqual(self.db[STATUS_TABLE].find_one(status_id="status1")["status_text"], "one")
+        self.assertEqual(self.db[STATUS_TABLE].find_one(status_id="status2")["status_text"], "Other")
 
-        # Call the function
-        result = main.update_status(status_id, user_id, status_text)
+    def test_update_users(self):
+        """
+        Test applying many user changes in one transaction.
+        """
+        summary = main.update_users([
+            {"user_id": "user1", "user_email": "one@uw.edu"},
+            {"user_id": "user2", "user_name": "Two", "user_last_name": "Users"},
+            {"user_id": "nouser", "user_name": "Nobody"},
+        ])
 
-        # Assertions
-        self.assertFalse(result)
-        self.mock_status_table.update.assert_not_called()
+        self.assertEqual(summary, {"updated": 2, "missing": ["nouser"]})
+        self.assertEqual(self.db[USER_TABLE].find_one(user_id="user1")["user_email"], "one@uw.edu")
+        self.assertEqual(self.db[USER_TABLE].find_one(user_id="user2")["user_last_name"], "Users")
 
 
 class TestDeleteStatusFunctions(unittest.TestCase):
@@ -1055,5 +1027,568 @@ class TestValidateLength(unittest.TestCase):
         result = main.validate_length(value, max_length)
         self.assertTrue(result)
 
+class TestBulkLoadUsers(unittest.TestCase):
+    """Unit tests for bulk_load_users against an in-memory database."""
+
+    def setUp(self):
+        """Set up an in-memory database."""
+        self.db = DataSet("sqlite:///:memory:")
+        main.db = self.db
+        self.filename = write_csv(
+            "USER_ID,NAME,LASTNAME,EMAIL\n"
+            "u1,Ann,Lee,ann@uw.edu\n"
+            "u2,Bob,Ray,bob@uw.edu\n"
+            "u1,Ann,Again,ann2@uw.edu\n"
+            "u3,,Missing,name@uw.edu\n"
+            "u4,Cat,Day,cat@uw.edu\n"
+        )
+
+    def tearDown(self):
+        """Remove the CSV file and close the database."""
+        os.remove(self.filename)
+        self.db.close()
+
+    @patch('builtins.print')
+    def test_bulk_load_users_batches(self, mock_print):
+        """Test that rows are loaded in batches and duplicates are reported."""
+        summary = main.bulk_load_users(self.filename, batch_size=2)
+
+        self.assertEqual(summary, {"loaded": 3, "duplicates": 1, "rejected": 1, "batches": 3})
+        self.assertEqual(len(self.db[USER_TABLE]), 3)
+        self.assertEqual(self.db[USER_TABLE].find_one(user_id="u1")["user_last_name"], "Lee")
+        mock_print.assert_any_call(
+            "Failed to add user due to duplicate user_id: "
+            "{'user_id': 'u1', 'user_email': 'ann2@uw.edu', 'user_name': 'Ann', 'user_last_name': 'Again'}"
+        )
+
+    @patch('builtins.print')
+    def test_bulk_load_users_existing_rows(self, mock_print):
+        """Test that users already in the database are rejected without aborting the load."""
+        main.bulk_load_users(self.filename)
+        summary = main.bulk_load_users(self.filename)
+
+        self.assertEqual(summary, {"loaded": 0, "duplicates": 4, "rejected": 1, "batches": 1})
+        self.assertEqual(len(self.db[USER_TABLE]), 3)
+        self.assertTrue(mock_print.called)
+
+    @patch('builtins.print')
+    def test_bulk_load_users_integrity_error_fallback(self, mock_print):
+        """Test that a batch hitting an IntegrityError only rejects the offending rows."""
+        main.ensure_columns(USER_TABLE, main.TABLE_COLUMNS[USER_TABLE])
+        self.db[USER_TABLE].create_index(["user_id"], unique=True)
+        with patch('loaders.find_existing', return_value=set()):
+            self.db[USER_TABLE].insert(user_id="u2", user_email="", user_name="", user_last_name="")
+            summary = main.bulk_load_users(self.filename)
+
+        self.assertEqual(summary["loaded"], 2)
+        self.assertEqual(summary["duplicates"], 2)
+        self.assertTrue(mock_print.called)
+
+    @patch('builtins.print')
+    def test_bulk_load_users_file_not_found(self, mock_print):
+        """Test that a missing file returns False."""
+        self.assertFalse(main.bulk_load_users("nonexistent.csv"))
+        mock_print.assert_called_once()
+
+
+class TestBulkAddStatuses(unittest.TestCase):
+    """Unit tests for set-based user validation when adding many statuses."""
+
+    def setUp(self):
+        """Set up an in-memory database with two users."""
+        self.db = DataSet("sqlite:///:memory:")
+        main.db = self.db
+        for user_id in ["u1", "u2"]:
+            self.db[USER_TABLE].insert(user_id=user_id, user_email="", user_name="", user_last_name="")
+        self.statuses = [
+            {"status_id": "s1", "user_id": "u1", "status_text": "one"},
+            {"status_id": "s2", "user_id": "ghost", "status_text": "two"},
+            {"status_id": "s3", "user_id": "u2", "status_text": "three"},
+            {"status_id": "s1", "user_id": "u2", "status_text": "again"},
+            {"status_id": "s4", "user_id": "ghost", "status_text": "four"},
+        ]
+
+    def tearDown(self):
+        """Close the database."""
+        self.db.close()
+
+    @patch('builtins.print')
+    def test_bulk_add_statuses(self, mock_print):
+        """Test that orphaned statuses are rejected in aggregate."""
+        summary = main.bulk_add_statuses(self.statuses)
+
+        self.assertEqual(summary, {"added": 2, "duplicates": 1, "orphans": 2})
+        self.assertEqual(len(self.db[STATUS_TABLE]), 2)
+        mock_print.assert_any_call("Failed to add 2 statuses because user_id does not exist: ['ghost']")
+
+    @patch('builtins.print')
+    def test_bulk_add_statuses_preloaded_users(self, _mock_print):
+        """Test validation against a preloaded set of user_ids without querying users."""
+        user_ids = main.load_user_ids()
+        self.assertEqual(user_ids, {"u1", "u2"})
+
+        with patch('loaders.find_existing', wraps=loaders.find_existing) as mock_find:
+            summary = main.bulk_add_statuses(self.statuses, batch_size=2, user_ids=user_ids)
+
+        self.assertEqual(summary, {"added": 2, "duplicates": 1, "orphans": 2})
+        for call in mock_find.call_args_list:
+            self.assertEqual(call.args[1], "status_id")
+
+
+class TestLookupCache(unittest.TestCase):
+    """Unit tests for the read-through cache behind search_user and search_status."""
+
+    def setUp(self):
+        """Set up an in-memory database with one user and status, and enable caching."""
+        self.db = DataSet("sqlite:///:memory:")
+        main.db = self.db
+        self.db[USER_TABLE].insert(user_id="u1", user_email="a@uw.edu", user_name="Ann", user_last_name="Lee")
+        self.db[STATUS_TABLE].insert(status_id="s1", user_id="u1", status_text="hello")
+        main.enable_cache(maxsize=10)
+
+    def tearDown(self):
+        """Disable caching and close the database."""
+        main.disable_cache()
+        self.db.close()
+
+    def test_search_user_cached(self):
+        """Test that repeated searches are served from the cache."""
+        main.search_user()("u1")
+        main.search_user()("u1")
+        self.assertEqual(main.cache_report()["user"]["hits"], 1)
+        self.assertEqual(main.cache_report()["user"]["misses"], 1)
+
+    def test_update_user_invalidates(self):
+        """Test that an updated user is reloaded from the database, while the user's statuses
+        stay cached."""
+        main.search_user()("u1")
+        main.search_status("s1")
+        with patch('main.cache_invalidate_where') as mock_invalidate_where:
+            main.update_user(self.db, "u1", "b@uw.edu", "Ann", "Lee")
+        mock_invalidate_where.assert_not_called()
+        self.assertEqual(main.search_user()("u1")["user_email"], "b@uw.edu")
+        self.assertEqual(main.cache_report()["status"]["size"], 1)
+
+    def test_update_status_invalidates(self):
+        """Test that an updated status is reloaded from the database."""
+        main.search_status("s1")
+        self.assertTrue(main.update_status("s1", "u1", "changed"))
+        self.assertEqual(main.search_status("s1")["status_text"], "changed")
+
+    @patch('builtins.print')
+    def test_delete_invalidates(self, _mock_print):
+        """Test that deleted users and statuses are no longer served from the cache."""
+        main.search_user()("u1")
+        main.search_status("s1")
+        self.assertTrue(main.delete_user("u1"))
+        self.assertIsNone(main.search_user()("u1"))
+        self.assertIsNone(main.search_status("s1"))
+
+    def test_delete_status_invalidates(self):
+        """Test that a deleted status is no longer served from the cache."""
+        main.search_status("s1")
+        self.assertTrue(main.delete_status("s1"))
+        self.assertIsNone(main.search_status("s1"))
+
+    def test_cache_disabled(self):
+        """Test that the report shows no caches once caching is disabled."""
+        main.disable_cache()
+        self.assertEqual(main.cache_report(), {"user": None, "status": None})
+
+
+class TestVerifiedUsers(unittest.TestCase):
+    """Unit tests for the verified-user cache of create_add_status_function."""
+
+    def setUp(self):
+        """Set up an in-memory database with two users."""
+        self.db = DataSet("sqlite:///:memory:")
+        main.db = self.db
+        for user_id in ["u1", "u2"]:
+            self.db[USER_TABLE].insert(user_id=user_id, user_email="", user_name="", user_last_name="")
+        main.ensure_columns(STATUS_TABLE, main.TABLE_COLUMNS[STATUS_TABLE])
+        self.add_status = main.create_add_status_function(maxsize=1)
+
+    def tearDown(self):
+        """Close the database."""
+        self.db.close()
+
+    def test_verified_user_skips_lookup(self):
+        """Test that a verified user is not looked up again."""
+        self.assertTrue(self.add_status("s1", "u1", "one"))
+        with patch('main.find_user') as mock_find_user:
+            self.assertTrue(self.add_status("s2", "u1", "two"))
+            mock_find_user.assert_not_called()
+
+    def test_verified_users_bounded(self):
+        """Test that the least recently verified user is evicted."""
+        self.add_status("s1", "u1", "one")
+        self.add_status("s2", "u2", "two")
+        with patch('main.find_user', wraps=main.find_user) as mock_find_user:
+            self.add_status("s3", "u1", "three")
+            mock_find_user.assert_called_once_with("u1")
+
+    @patch('builtins.print')
+    def test_delete_user_invalidates_verified_users(self, mock_print):
+        """Test that a deleted user cannot receive statuses through a cached verification."""
+        self.assertTrue(self.add_status("s1", "u1", "one"))
+        self.assertTrue(main.delete_user("u1"))
+        self.assertFalse(self.add_status("s2", "u1", "two"))
+        mock_print.assert_called_with("Failed to add status because user_id does not exist: u1")
+        self.assertEqual(len(self.db[STATUS_TABLE]), 0)
+
+
+class TestDeleteStatusWithoutUser(unittest.TestCase):
+    """Unit tests for the set-based orphan cleanup."""
+
+    def setUp(self):
+        """Set up an in-memory database with one user and some orphaned statuses."""
+        self.db = DataSet("sqlite:///:memory:")
+        main.db = self.db
+        self.db[USER_TABLE].insert(user_id="u1", user_email="", user_name="", user_last_name="")
+        for number in range(5):
+            self.db[STATUS_TABLE].insert(status_id=f"s{number}", user_id="u1" if number % 2 else "gone", status_text="")
+
+    def tearDown(self):
+        """Close the database."""
+        self.db.close()
+
+    @patch('builtins.print')
+    def test_delete_status_without_user(self, mock_print):
+        """Test that only orphaned statuses are deleted, in batches."""
+        self.assertEqual(main.delete_status_without_user(batch_size=2), 3)
+
+        self.assertEqual(sorted(status["status_id"] for status in self.db[STATUS_TABLE].all()), ["s1", "s3"])
+        mock_print.assert_called_once_with("Deleted 3 statuses without a user")
+        self.assertEqual(main.delete_status_without_user(), 0)
+
+    @patch('builtins.print')
+    def test_delete_invalidates_cache(self, _mock_print):
+        """Test that deleted orphans are no longer served from the cache."""
+        main.enable_cache(maxsize=10)
+        try:
+            self.assertIsNotNone(main.search_status("s0"))
+            self.assertIsNotNone(main.search_status("s1"))
+            main.delete_status_without_user()
+            self.assertIsNone(main.search_status("s0"))
+            self.assertEqual(main.cache_report()["status"]["size"], 1)
+        finally:
+            main.disable_cache()
+
+
+class TestUpsertLoads(unittest.TestCase):
+    """Unit tests for the upsert mode of the bulk loaders."""
+
+    def setUp(self):
+        """Set up an in-memory database loaded with two users and two statuses."""
+        self.db = DataSet("sqlite:///:memory:")
+        main.db = self.db
+        self.files = [
+            write_csv("USER_ID,NAME,LASTNAME,EMAIL\nu1,Ann,Lee,ann@uw.edu\nu2,Bob,Ray,bob@uw.edu\n"),
+            write_csv("STATUS_ID,USER_ID,STATUS_TEXT\ns1,u1,one\ns2,u2,two\n"),
+        ]
+        with patch('builtins.print'):
+            main.bulk_load_users(self.files[0])
+            streaming.stream_status_updates(self.files[1])
+
+    def tearDown(self):
+        """Remove the CSV files and close the database."""
+        for filename in self.files:
+            os.remove(filename)
+        self.db.close()
+
+    @patch('builtins.print')
+    def test_upsert_users(self, _mock_print):
+        """Test that a refreshed user file inserts new users and updates changed ones."""
+        self.files.append(write_csv(
+            "USER_ID,NAME,LASTNAME,EMAIL\n"
+            "u1,Ann,Lee,ann@uw.edu\n"
+            "u2,Bob,Ray,robert@uw.edu\n"
+            "u3,Cat,Day,cat@uw.edu\n"
+        ))
+        summary = main.bulk_load_users(self.files[-1], upsert=True)
+
+        self.assertEqual(summary, {"inserted": 1, "updated": 1, "unchanged": 1, "rejected": 0, "batches": 1})
+        self.assertEqual(len(self.db[USER_TABLE]), 3)
+        self.assertEqual(self.db[USER_TABLE].find_one(user_id="u2")["user_email"], "robert@uw.edu")
+
+    @patch('builtins.print')
+    def test_upsert_users_validated(self, mock_print):
+        """Test that an upsert rejects invalid rows instead of writing them over stored users."""
+        self.files.append(write_csv(
+            "USER_ID,NAME,LASTNAME,EMAIL\n"
+            "u1,Ann,Lee,not-an-email\n"
+            f"u2,{'B' * 31},Ray,bob@uw.edu\n"
+            "u3,Cat,Day,cat@uw.edu\n"
+        ))
+        summary = main.bulk_load_users(self.files[-1], upsert=True)
+
+        self.assertEqual(summary, {"inserted": 1, "updated": 0, "unchanged": 0, "rejected": 2, "batches": 1})
+        self.assertEqual(self.db[USER_TABLE].find_one(user_id="u1")["user_email"], "ann@uw.edu")
+        self.assertEqual(self.db[USER_TABLE].find_one(user_id="u2")["user_name"], "Bob")
+        mock_print.assert_any_call("Rejected 2 invalid users: {'invalid_user_email': 1, 'too_long_user_name': 1}")
+
+    @patch('builtins.print')
+    def test_upsert_statuses(self, mock_print):
+        """Test that a refreshed status file inserts, updates and rejects orphans in one pass."""
+        self.files.append(write_csv(
+            "STATUS_ID,USER_ID,STATUS_TEXT\n"
+            "s1,u1,one\n"
+            "s2,u2,changed\n"
+            "s3,u2,three\n"
+            "s4,ghost,four\n"
+        ))
+        summary = streaming.upsert_status_updates(self.files[-1])
+
+        self.assertEqual(
+            summary,
+            {"inserted": 1, "updated": 1, "unchanged": 1, "orphans": 1, "batches": 1, "rows": 4},
+        )
+        self.assertEqual(self.db[STATUS_TABLE].find_one(status_id="s2")["status_text"], "changed")
+        mock_print.assert_called_once_with("Failed to add 1 statuses because user_id does not exist: ['ghost']")
+
+
+class TestValidateUsers(unittest.TestCase):
+    """Unit tests for batch validation of user rows."""
+
+    columns = list(main.USER_FIELDS.values())
+
+    def test_validate_users(self):
+        """Test that invalid rows are reported with every reason and valid rows kept in order."""
+        rows = [
+            ("u1", "ann@uw.edu", "Ann", "Lee"),
+            ("u" * 31, "not-an-email", "Bob", "Ray"),
+            ("u3", "cat@uw.edu", "", "L" * 101),
+            ("u4", "dan@uw.edu", "Dan", "Day"),
+        ]
+        valid, rejected = main.validate_users(rows, self.columns)
+
+        self.assertEqual(valid, [rows[0], rows[3]])
+        self.assertEqual(rejected, [
+            (rows[1], ["too_long_user_id", "invalid_user_email"]),
+            (rows[2], ["missing_user_name", "too_long_user_last_name"]),
+        ])
+
+    def test_validate_users_empty(self):
+        """Test that an empty batch validates to nothing."""
+        self.assertEqual(main.validate_users([], self.columns), ([], []))
+
+    @patch('builtins.print')
+    def test_report_invalid_users(self, mock_print):
+        """Test that rejections are summarised in a single line."""
+        main.report_invalid_users([(("u1",), ["missing_user_name"]), (("u2",), ["missing_user_name"])])
+        mock_print.assert_called_once_with("Rejected 2 invalid users: {'missing_user_name': 2}")
+
+
+class TestRejectionReports(unittest.TestCase):
+    """Unit tests for loaders writing rejected rows to a report file."""
+
+    def setUp(self):
+        """Set up an in-memory database, a user file with bad rows and a report path."""
+        self.db = DataSet("sqlite:///:memory:")
+        main.db = self.db
+        main.ensure_indexes(self.db)
+        self.users_file = write_csv(
+            "USER_ID,NAME,LASTNAME,EMAIL\n"
+            "u1,Ann,Lee,ann@uw.edu\n"
+            "u1,Ann,Again,ann2@uw.edu\n"
+            "u3,,Missing,name@uw.edu\n"
+        )
+        self.statuses_file = write_csv(
+            "STATUS_ID,USER_ID,STATUS_TEXT\n"
+            "s1,u1,one\n"
+            "s1,u1,again\n"
+            "s2,nobody,orphan\n"
+            "s3,u1,\n"
+        )
+        self.rejects = self.users_file + ".rejects.jsonl"
+
+    def tearDown(self):
+        """Remove the files and close the database."""
+        for filename in [self.users_file, self.statuses_file, self.rejects]:
+            if os.path.exists(filename):
+                os.remove(filename)
+        self.db.close()
+
+    @patch('builtins.print')
+    def test_load_users_rejects(self, mock_print):
+        """Test that load_users writes rejected rows to the report and returns counts."""
+        summary = main.load_users(self.users_file, rejects=self.rejects)
+
+        self.assertEqual(summary, {
+            "loaded": 1, "rejected": 2,
+            "reasons": {"duplicate_user_id": 1, "missing_fields": 1},
+            "rejects": self.rejects,
+        })
+        mock_print.assert_not_called()
+        self.assertEqual(rejections.read_report(self.rejects)[0], ("duplicate_user_id", {
+            "user_id": "u1", "user_email": "ann2@uw.edu", "user_name": "Ann", "user_last_name": "Again",
+        }))
+
+    @patch('builtins.print')
+    def test_load_status_updates_rejects(self, mock_print):
+        """Test that load_status_updates goes on past duplicates when writing a report."""
+        main.load_users(self.users_file, rejects=self.rejects)
+        summary = main.load_status_updates(self.statuses_file, rejects=self.rejects)
+
+        self.assertEqual(summary["loaded"], 2)
+        self.assertEqual(summary["reasons"], {"duplicate_status_id": 1, "missing_fields": 1})
+        mock_print.assert_not_called()
+
+    @patch('builtins.print')
+    def test_bulk_loaders_rejects(self, mock_print):
+        """Test that the batched loaders write every rejection to the report."""
+        summary = main.bulk_load_users(self.users_file, rejects=self.rejects)
+        self.assertEqual(summary, {
+            "loaded": 1, "duplicates": 1, "rejected": 2, "batches": 1,
+            "reasons": {"duplicate_user_id": 1, "missing_user_name": 1}, "rejects": self.rejects,
+        })
+        self.assertEqual(
+            [reason for reason, _ in rejections.read_report(self.rejects)],
+            ["missing_user_name", "duplicate_user_id"],
+        )
+
+        summary = streaming.stream_status_updates(self.statuses_file, rejects=self.rejects)
+        self.assertEqual(summary, {
+            "loaded": 1, "duplicates": 1, "orphans": 1, "batches": 1, "rejected": 3,
+            "reasons": {"duplicate_status_id": 1, "missing_fields": 1, "unknown_user_id": 1},
+            "rejects": self.rejects, "rows": 4,
+        })
+        self.assertEqual(
+            [reason for reason, _ in rejections.read_report(self.rejects)],
+            ["duplicate_status_id", "unknown_user_id", "missing_fields"],
+        )
+        self.assertFalse(any("Failed" in str(call) for call in mock_print.call_args_list))
+
+    @patch('builtins.print')
+    def test_upsert_and_sync_rejects(self, mock_print):
+        """Test that upserting and syncing users write invalid rows to the report."""
+        summary = main.bulk_load_users(self.users_file, upsert=True, rejects=self.rejects)
+        self.assertEqual(summary, {
+            "inserted": 1, "updated": 0, "unchanged": 0, "rejected": 1, "batches": 1,
+            "reasons": {"missing_user_name": 1}, "rejects": self.rejects,
+        })
+
+        summary = sync.sync_users(self.users_file, rejects=self.rejects)
+        self.assertEqual(summary, {
+            "added": 1, "changed": 0, "unchanged": 0, "rejected": 1, "removed": 0,
+            "reasons": {"missing_user_name": 1}, "rejects": self.rejects,
+        })
+        self.assertEqual(rejections.read_report(self.rejects), [("missing_user_name", {
+            "user_id": "u3", "user_email": "name@uw.edu", "user_name": "", "user_last_name": "Missing",
+        })])
+        self.assertFalse(any("Rejected" in str(call) for call in mock_print.call_args_list))
+
+
+class TestSearchUsersByPrefix(unittest.TestCase):
+    """Unit tests for prefix search over user names and emails."""
+
+    def setUp(self):
+        """Set up an in-memory database with indexed users."""
+        self.db = DataSet("sqlite:///:memory:")
+        main.db = self.db
+        main.ensure_indexes(self.db)
+        for user_id, name, last_name in [
+                ("u1", "Ann", "Lee"), ("u2", "Anna", "Ray"), ("u3", "Bob", "Annis"),
+                ("u4", "Ann", "Day"), ("u5", "ann", "Low")]:
+            self.db[main.USER_TABLE].insert(user_id=user_id, user_email=f"{user_id}@uw.edu",
+                                            user_name=name, user_last_name=last_name)
+
+    def tearDown(self):
+        """Close the database."""
+        self.db.close()
+
+    def test_prefix_pages(self):
+        """Test that matches come back in order, a page at a time, until the cursor runs out."""
+        page = main.search_users_by_prefix("Ann", limit=2)
+        self.assertEqual([user["user_id"] for user in page["users"]], ["u1", "u4"])
+        self.assertEqual(page["cursor"], ("Ann", "u4"))
+
+        page = main.search_users_by_prefix("Ann", limit=2, cursor=page["cursor"])
+        self.assertEqual([user["user_id"] for user in page["users"]], ["u5", "u2"])
+        self.assertIsNone(page["cursor"])
+
+    def test_prefix_ignores_case(self):
+        """Test that the prefix matches whatever the case of its ASCII letters."""
+        for prefix in ["ann", "ANN", "aNn"]:
+            page = main.search_users_by_prefix(prefix)
+            self.assertEqual([user["user_id"] for user in page["users"]], ["u1", "u4", "u5", "u2"])
+        self.assertEqual(len(main.search_users_by_prefix("U", field="user_email")["users"]), 5)
+        self.assertEqual(main.search_users_by_prefix("bO")["users"][0]["user_id"], "u3")
+
+    def test_other_fields(self):
+        """Test searching by last name and email, and a prefix with no match."""
+        self.assertEqual(
+            main.search_users_by_prefix("Ann", field="user_last_name")["users"],
+            [{"user_id": "u3", "user_email": "u3@uw.edu", "user_name": "Bob",
+              "user_last_name": "Annis"}],
+        )
+        self.assertEqual(len(main.search_users_by_prefix("u", field="user_email")["users"]), 5)
+        self.assertEqual(main.search_users_by_prefix("Zed")["users"], [])
+        with self.assertRaises(ValueError):
+            main.search_users_by_prefix("Ann", field="user_id")
+
+    def test_prefix_bound(self):
+        """Test the exclusive upper bound of a prefix range."""
+        self.assertEqual(main.prefix_bound("Ann"), "Ano")
+        self.assertEqual(main.prefix_bound("a" + chr(0x10FFFF)), "b")
+        self.assertIsNone(main.prefix_bound(""))
+        self.assertEqual(main.prefix_bound("john@"), "john[")
+
+    def test_email_prefix_ending_in_at(self):
+        """Test that an email prefix ending in "@" only matches that user name."""
+        for user_id, email in [("j1", "john@x.com"), ("j2", "john_doe@x.com"),
+                               ("j3", "john^x@y.com"), ("j4", "JOHN@Y.com")]:
+            self.db[main.USER_TABLE].insert(user_id=user_id, user_email=email,
+                                            user_name="John", user_last_name="Doe")
+        page = main.search_users_by_prefix("john@", field="user_email")
+        self.assertEqual([user["user_id"] for user in page["users"]], ["j1", "j4"])
+
+    def test_uses_index(self):
+        """Test that the prefix query is a range scan over the declared index."""
+        model = self.db[main.USER_TABLE].model_class
+        name = model.user_name.collate("NOCASE")
+        query = model.select().where((name >= "ann") & (name < "ano"))
+        sql, params = query.order_by(name, model.user_id).sql()
+        plan = self.db.query(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        self.assertIn("USING INDEX", plan[0][-1])
+        self.assertNotIn("TEMP B-TREE", " ".join(row[-1] for row in plan))
+
+
+class TestListStatuses(unittest.TestCase):
+    """Unit tests for keyset pagination of a user's statuses."""
+
+    def setUp(self):
+        """Set up an in-memory database with statuses for two users."""
+        self.db = DataSet("sqlite:///:memory:")
+        main.db = self.db
+        main.ensure_indexes(self.db)
+        for number in range(5):
+            self.db[STATUS_TABLE].insert(status_id=f"s{number}", user_id="u1", status_text=f"text {number}")
+        self.db[STATUS_TABLE].insert(status_id="s9", user_id="u2", status_text="other")
+
+    def tearDown(self):
+        """Close the database."""
+        self.db.close()
+
+    def test_pages(self):
+        """Test that pages follow each other without gaps or overlap."""
+        first = main.list_statuses("u1", limit=2)
+        self.assertEqual([status["status_id"] for status in first], ["s0", "s1"])
+        self.assertEqual(first[0], {"status_id": "s0", "user_id": "u1", "status_text": "text 0"})
+        second = main.list_statuses("u1", after=first[-1]["status_id"], limit=2)
+        self.assertEqual([status["status_id"] for status in second], ["s2", "s3"])
+        last = main.list_statuses("u1", after=second[-1]["status_id"], limit=2)
+        self.assertEqual([status["status_id"] for status in last], ["s4"])
+        self.assertEqual(main.list_statuses("u1", after="s4"), [])
+        self.assertEqual(main.list_statuses("nobody"), [])
+
+    def test_uses_index(self):
+        """Test that a page is an index seek with no sort."""
+        sql, params = main.list_statuses_query("u1", after="s1", limit=2).sql()
+        plan = " ".join(row[-1] for row in self.db.query(f"EXPLAIN QUERY PLAN {sql}", params).fetchall())
+        self.assertIn("user_id=? AND status_id>?", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,183 @@
+"""
+Unittests for parallel_load.py
+"""
+
+import multiprocessing
+import os
+import unittest
+from unittest.mock import patch
+from playhouse.dataset import DataSet
+import main
+import parallel_load
+import rejections
+from csv_fixtures import write_csv
+
+
+class TestParallelLoad(unittest.TestCase):
+    """
+    Testing class for parallel_load.py
+    """
+
+    def setUp(self):
+        """
+        create an in-memory database and a user file with some invalid rows
+        """
+        self.db = DataSet("sqlite:///:memory:")
+        main.db = self.db
+        lines = ["USER_ID,NAME,LASTNAME,EMAIL"]
+        lines += [f"user{number},Name{number},Last{number},user{number}@uw.edu"
+                  for number in range(100)]
+        lines += ["user1,Dup,Licate,dup@uw.edu", "nouser,,Empty,empty@uw.edu",
+                  f"{'x' * 31},Long,Id,long@uw.edu", "bademail,Bad,Email,not-an-email"]
+        self.filename = write_csv("\n".join(lines) + "\n")
+
+    def tearDown(self):
+        """
+        remove the user file and close the database
+        """
+        os.remove(self.filename)
+        self.db.close()
+
+    def test_shard_offsets(self):
+        """
+        test that shards cover every row exactly once and start on line boundaries
+        """
+        header, shards = parallel_load.shard_offsets(self.filename, 4)
+        self.assertEqual(header, ["USER_ID", "NAME", "LASTNAME", "EMAIL"])
+        self.assertEqual(len(shards), 4)
+        self.assertEqual(shards[-1][1], os.path.getsize(self.filename))
+        with open(self.filename, "rb") as csvfile:
+            content = csvfile.read()
+        for (_, end), (start, _) in zip(shards, shards[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(content[start - 1:start], b"\n")
+
+    @patch('builtins.print')
+    def test_parallel_load_users(self, _mock_print):
+        """
+        test loading users with several parser processes
+        """
+        summary = parallel_load.parallel_load_users(self.filename, workers=3, batch_size=16)
+        self.assertEqual(summary["loaded"], 100)
+        self.assertEqual(summary["duplicates"], 1)
+        self.assertEqual(summary["orphans"], 0)
+        self.assertEqual(summary["rejected"], 3)
+        self.assertEqual(summary["workers"], 3)
+        self.assertEqual(len(self.db[main.USER_TABLE]), 100)
+
+    @patch('builtins.print')
+    def test_rejections_reported(self, mock_print):
+        """
+        test that invalid and duplicate users are printed, or written to a rejects report
+        """
+        parallel_load.parallel_load_users(self.filename, workers=1, batch_size=200)
+        mock_print.assert_any_call("Rejected 3 invalid users: {'invalid_user_email': 1, "
+                                   "'missing_user_name': 1, 'too_long_user_id': 1}")
+        mock_print.assert_any_call("Failed to add user due to duplicate user_id: {'user_id': "
+                                   "'user1', 'user_email': 'dup@uw.edu', 'user_name': 'Dup', "
+                                   "'user_last_name': 'Licate'}")
+
+        self.db[main.USER_TABLE].delete()
+        rejects = self.filename + ".rejects.jsonl"
+        try:
+            summary = parallel_load.parallel_load_users(self.filename, workers=3, rejects=rejects)
+            reasons = sorted(reason for reason, _ in rejections.read_report(rejects))
+        finally:
+            os.remove(rejects)
+        self.assertEqual(summary["loaded"], 100)
+        self.assertEqual(summary["rejects"], rejects)
+        self.assertEqual(summary["reasons"], {
+            "duplicate_user_id": 1, "invalid_user_email": 1, "missing_user_name": 1,
+            "too_long_user_id": 1,
+        })
+        self.assertEqual(reasons, ["duplicate_user_id", "invalid_user_email",
+                                   "missing_user_name", "too_long_user_id"])
+
+    @patch('builtins.print')
+    def test_writer_failure_stops_parsers(self, mock_print):
+        """
+        test that a failing writer stops the parsers blocked on the full queue
+        """
+        def fail(rows, columns, report):
+            raise RuntimeError("disk full")
+
+        with patch.dict(parallel_load.USER_LOAD, {"write_batch": fail}):
+            self.assertFalse(parallel_load.parallel_load_users(self.filename, workers=3,
+                                                               batch_size=1))
+        mock_print.assert_called_once_with("An error occurred while loading users: disk full")
+        self.assertEqual(multiprocessing.active_children(), [])
+
+    @patch('builtins.print')
+    def test_parallel_load_status_updates(self, _mock_print):
+        """
+        test that statuses of unknown users are rejected
+        """
+        parallel_load.parallel_load_users(self.filename, workers=2)
+        filename = write_csv(
+            "STATUS_ID,USER_ID,STATUS_TEXT\ns1,user1,one\ns2,ghost,two\ns3,user2,three\n"
+        )
+        try:
+            summary = parallel_load.parallel_load_status_updates(filename, workers=2)
+        finally:
+            os.remove(filename)
+        self.assertEqual(summary["loaded"], 2)
+        self.assertEqual(summary["duplicates"], 0)
+        self.assertEqual(summary["orphans"], 1)
+
+    @patch('builtins.print')
+    def test_quoted_line_breaks(self, _mock_print):
+        """
+        test that status text with line breaks is loaded whole, however the file is sharded
+        """
+        parallel_load.parallel_load_users(self.filename, workers=2)
+        lines = ["STATUS_ID,USER_ID,STATUS_TEXT"]
+        lines += [f's{number},user{number % 100},"line one\nline {number}"'
+                  for number in range(200)]
+        filename = write_csv("\n".join(lines) + "\n")
+        try:
+            _, shards = parallel_load.shard_offsets(filename, 7)
+            with open(filename, "rb") as csvfile:
+                content = csvfile.read()
+            for start, _ in shards[1:]:
+                self.assertEqual(content[start:start + 1], b"s")
+            for workers in [1, 4]:
+                self.db[main.STATUS_TABLE].delete()
+                summary = parallel_load.parallel_load_status_updates(filename, workers=workers)
+                self.assertEqual(summary["loaded"], 200)
+                self.assertEqual(summary["rejected"], 0)
+                status = self.db[main.STATUS_TABLE].find_one(status_id="s7")
+                self.assertEqual(status["status_text"], "line one\nline 7")
+        finally:
+            os.remove(filename)
+
+    @patch('builtins.print')
+    def test_unclosed_quote(self, mock_print):
+        """
+        test that a quoted field left open fails the load instead of being cut short
+        """
+        parallel_load.parallel_load_users(self.filename, workers=2)
+        filename = write_csv('STATUS_ID,USER_ID,STATUS_TEXT\ns1,user1,"never closed\n')
+        try:
+            self.assertFalse(parallel_load.parallel_load_status_updates(filename, workers=1))
+        finally:
+            os.remove(filename)
+        self.assertIn("unexpected end of data", str(mock_print.call_args))
+        self.assertEqual(len(self.db[main.STATUS_TABLE]), 0)
+
+    @patch('builtins.print')
+    def test_parallel_load_missing_column(self, mock_print):
+        """
+        test that a file without the required columns is not loaded
+        """
+        filename = write_csv("USER_ID,NAME\nu1,Ann\n")
+        try:
+            self.assertFalse(parallel_load.parallel_load_users(filename, workers=2))
+        finally:
+            os.remove(filename)
+        mock_print.assert_called_once_with(
+            "An error occurred while loading users: 'EMAIL, LASTNAME'"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Unittests for rejections.py
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from playhouse.dataset import DataSet
+import rejections
+import user_status
+import users
+
+
+class TestRejections(unittest.TestCase):
+    """
+    Testing class for rejections.py
+    """
+
+    def setUp(self):
+        """
+        pick a report file name
+        """
+        descriptor, self.filename = tempfile.mkstemp(suffix=".jsonl")
+        os.close(descriptor)
+
+    def tearDown(self):
+        """
+        remove the report file
+        """
+        os.remove(self.filename)
+
+    def test_report_round_trip(self):
+        """
+        test that rejected rows are written with their reasons and counted
+        """
+        report = rejections.open_report(self.filename)
+        rejections.reject(report, "duplicate_user_id", {"user_id": "u1"})
+        rejections.reject(report, "missing_fields", {"user_id": ""})
+        rejections.reject(report, "duplicate_user_id", {"user_id": "u2"})
+        summary = rejections.close_report(report)
+
+        self.assertEqual(summary, {
+            "rejected": 3,
+            "reasons": {"duplicate_user_id": 2, "missing_fields": 1},
+            "rejects": self.filename,
+        })
+        self.assertEqual(rejections.read_report(self.filename), [
+            ("duplicate_user_id", {"user_id": "u1"}),
+            ("missing_fields", {"user_id": ""}),
+            ("duplicate_user_id", {"user_id": "u2"}),
+        ])
+
+    def test_report_append(self):
+        """
+        test that a report opened in append mode keeps the earlier rows
+        """
+        with rejections.rejection_report(self.filename) as report:
+            rejections.reject(report, "missing_fields", {"user_id": "u1"})
+        with rejections.rejection_report(self.filename, "a") as report:
+            rejections.reject(report, "missing_fields", {"user_id": "u2"})
+        self.assertEqual(len(rejections.read_report(self.filename)), 2)
+
+    @patch('builtins.print')
+    def test_reject_without_report(self, mock_print):
+        """
+        test that without a report the message is printed
+        """
+        with rejections.rejection_report(None) as report:
+            self.assertIsNone(report)
+            rejections.reject(report, "missing_fields", {}, "Bad row")
+            rejections.reject(report, "missing_fields", {})
+        mock_print.assert_called_once_with("Bad row")
+
+    @patch('builtins.print')
+    def test_add_user_and_status_report(self, mock_print):
+        """
+        test that users.add_user and user_status.add_status write duplicates to a report
+        """
+        db = DataSet("sqlite:///:memory:")
+        db[users.USER_TABLE].insert(user_id="u1")
+        db[users.USER_TABLE].create_index(["user_id"], unique=True)
+        db[user_status.STATUS_TABLE].insert(status_id="s1")
+        db[user_status.STATUS_TABLE].create_index(["status_id"], unique=True)
+        with rejections.rejection_report(self.filename) as report:
+            self.assertFalse(users.add_user(db, report)(user_id="u1"))
+            self.assertFalse(user_status.add_status(db, report)(status_id="s1"))
+        db.close()
+
+        mock_print.assert_not_called()
+        self.assertEqual(rejections.read_report(self.filename), [
+            ("duplicate_user_id", {"user_id": "u1"}),
+            ("duplicate_status_id", {"status_id": "s1"}),
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
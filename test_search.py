@@ -0,0 +1,78 @@
+"""
+Unittests for search.py
+"""
+
+import unittest
+from unittest.mock import patch
+from playhouse.dataset import DataSet
+import main
+import search
+
+
+class TestSearchStatuses(unittest.TestCase):
+    """Unit tests for full-text search over status_text."""
+
+    def setUp(self):
+        """Set up an in-memory database with a user, statuses and the search index."""
+        self.db = DataSet("sqlite:///:memory:")
+        main.db = self.db
+        self.db[main.USER_TABLE].insert(user_id="u1", user_email="", user_name="",
+                                        user_last_name="")
+        self.db[main.STATUS_TABLE].insert(status_id="s1", user_id="u1",
+                                          status_text="sunny day at the beach")
+        main.ensure_status_search(self.db)
+
+    def tearDown(self):
+        """Close the database."""
+        self.db.close()
+
+    def search_ids(self, text, **kwargs):
+        """Returns the status_ids found for text."""
+        return [result["status_id"] for result in search.search_statuses(text, **kwargs)]
+
+    @patch('builtins.print')
+    def test_index_follows_writes(self, _):
+        """Test that existing rows are indexed and add, update and delete keep the index in sync."""
+        self.assertEqual(self.search_ids("beach"), ["s1"])
+
+        main.create_add_status_function()("s2", "u1", "Rainy day in the city")
+        self.assertEqual(self.search_ids("day"), ["s1", "s2"])
+
+        main.update_status("s2", "u1", "snow in the mountains")
+        self.assertEqual(self.search_ids("rainy"), [])
+        self.assertEqual(self.search_ids("SNOW"), ["s2"])
+
+        main.delete_status("s1")
+        self.assertEqual(self.search_ids("beach"), [])
+
+    @patch('builtins.print')
+    def test_bulk_loaded_statuses_are_indexed(self, _):
+        """Test that statuses added by the bulk loaders are searchable."""
+        main.bulk_add_statuses([
+            {"status_id": f"b{number}", "user_id": "u1", "status_text": f"bulk post {number}"}
+            for number in range(5)
+        ])
+        self.assertEqual(len(self.search_ids("bulk post", limit=100)), 5)
+
+    def test_ranked_pages(self):
+        """Test that better matches come first and pages do not overlap."""
+        add_status = main.create_add_status_function()
+        add_status("s2", "u1", "cat")
+        add_status("s3", "u1", "cat cat cat and a dog")
+        add_status("s4", "u1", "a dog")
+
+        self.assertEqual(self.search_ids("dog"), ["s4", "s3"])
+        first = self.search_ids("cat", limit=1)
+        second = self.search_ids("cat", limit=1, offset=1)
+        self.assertEqual(len(first + second), 2)
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.search_ids("cat dog"), ["s3"])
+
+    def test_search_text_is_literal(self):
+        """Test that FTS5 syntax in the search text is not interpreted."""
+        self.assertEqual(self.search_ids('beach" OR "x'), [])
+        self.assertEqual(self.search_ids("   "), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
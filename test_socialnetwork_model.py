@@ -0,0 +1,123 @@
+"""
+Unittests for socialnetwork_model.py
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+import socialnetwork_model
+
+
+class TestSocialNetworkModel(unittest.TestCase):
+    """
+    Testing class for socialnetwork_model.py
+    """
+
+    def setUp(self):
+        """
+        use a database file in a temporary directory
+        """
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.database = os.path.join(self.directory.name, "test.db")
+
+    def tearDown(self):
+        """
+        close the pool and remove the database file
+        """
+        socialnetwork_model.close_ds(self.database)
+        self.directory.cleanup()
+
+    def test_get_ds_shared(self):
+        """
+        test that the same DataSet is returned for the same database
+        """
+        first = socialnetwork_model.get_ds(self.database)
+        second = socialnetwork_model.get_ds(self.database)
+        self.assertIs(first, second)
+
+    def test_close_ds(self):
+        """
+        test that a closed database gets a new DataSet
+        """
+        first = socialnetwork_model.get_ds(self.database)
+        socialnetwork_model.close_ds(self.database)
+        self.assertNotIn(self.database, socialnetwork_model.DATASETS)
+        self.assertIsNot(socialnetwork_model.get_ds(self.database), first)
+
+    def test_connection_per_thread(self):
+        """
+        test that threads share the DataSet but use their own connections
+        """
+        ds = socialnetwork_model.get_ds(self.database)
+        ds["UserModel"].insert(user_id="u1")
+        results = []
+
+        def worker():
+            with socialnetwork_model.connection(self.database) as thread_ds:
+                user = thread_ds["UserModel"].find_one(user_id="u1")
+                results.append((thread_ds, user["user_id"]))
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [(ds, "u1")] * 3)
+
+    def test_pool_limit(self):
+        """
+        test that threads ending without releasing their connection do not exhaust the pool
+        """
+        ds = socialnetwork_model.get_ds(self.database)
+        ds["UserModel"].insert(user_id="u1")
+        results = []
+
+        def worker():
+            results.append(ds["UserModel"].find_one(user_id="u1")["user_id"])
+
+        for _ in range(socialnetwork_model.MAX_CONNECTIONS * 2):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+        self.assertEqual(results, ["u1"] * socialnetwork_model.MAX_CONNECTIONS * 2)
+
+    def test_serving_profile(self):
+        """
+        test that new connections get the serving pragmas
+        """
+        socialnetwork_model.get_ds(self.database)
+        self.assertEqual(
+            socialnetwork_model.pragma_report(self.database),
+            {"journal_mode": "wal", "synchronous": 1, "cache_size": -64000,
+             "mmap_size": 268435456, "temp_store": 2},
+        )
+
+    def test_apply_profile(self):
+        """
+        test switching to the bulk load profile and back, including for pooled connections
+        """
+        def thread_report():
+            reports = []
+
+            def worker():
+                with socialnetwork_model.connection(self.database):
+                    reports.append(socialnetwork_model.pragma_report(self.database))
+
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+            return reports[0]
+
+        socialnetwork_model.apply_profile("bulk_load", self.database)
+        self.assertEqual(socialnetwork_model.pragma_report(self.database)["synchronous"], 0)
+        self.assertEqual(thread_report()["cache_size"], -256000)
+
+        socialnetwork_model.apply_profile("serving", self.database)
+        self.assertEqual(socialnetwork_model.pragma_report(self.database)["synchronous"], 1)
+        # The worker gets the idle connection the previous worker returned to the pool
+        self.assertEqual(thread_report(), socialnetwork_model.pragma_report(self.database))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Unittests for status_queue.py
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+import main
+import socialnetwork_model
+import status_queue
+
+
+class TestStatusQueue(unittest.TestCase):
+    """
+    Testing class for status_queue.py, against a database file shared with the writer thread
+    """
+
+    def setUp(self):
+        """
+        point main at a fresh database file with one user
+        """
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.database = os.path.join(self.directory.name, "statuses.db")
+        main.db = main.init_database(self.database)
+        main.db[main.USER_TABLE].insert(
+            user_id="u1", user_email="", user_name="", user_last_name=""
+        )
+
+    def tearDown(self):
+        """
+        close and remove the database
+        """
+        socialnetwork_model.close_ds(self.database)
+        self.directory.cleanup()
+
+    @patch('builtins.print')
+    def test_post_status(self, mock_print):
+        """
+        test that futures resolve to whether each status was added
+        """
+        statuses = status_queue.create_status_queue(flush_interval=0.05)
+        added = status_queue.post_status(statuses, "s1", "u1", "one")
+        duplicate = status_queue.post_status(statuses, "s1", "u1", "again")
+        orphan = status_queue.post_status(statuses, "s2", "nobody", "orphan")
+
+        self.assertTrue(added.result(timeout=5))
+        self.assertFalse(duplicate.result(timeout=5))
+        self.assertFalse(orphan.result(timeout=5))
+        status_queue.close_status_queue(statuses)
+
+        self.assertEqual(main.db[main.STATUS_TABLE].find_one(status_id="s1")["status_text"], "one")
+        self.assertEqual(status_queue.status_queue_stats(statuses), {
+            "depth": 0, "posted": 3, "committed": 1, "rejected": 2, "commits": 1,
+        })
+        mock_print.assert_any_call(
+            "Failed to add 1 statuses because user_id does not exist: ['nobody']"
+        )
+
+    def test_group_commit_from_many_threads(self):
+        """
+        test that posts from many threads share commits, capped at max_rows
+        """
+        statuses = status_queue.create_status_queue(flush_interval=0.05, max_rows=100)
+        futures = []
+
+        def post(thread):
+            for number in range(50):
+                futures.append(
+                    status_queue.post_status(statuses, f"s{thread}.{number}", "u1", "text")
+                )
+
+        threads = [threading.Thread(target=post, args=(thread,)) for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        status_queue.close_status_queue(statuses)
+
+        self.assertTrue(all(future.result() for future in futures))
+        self.assertEqual(len(main.db[main.STATUS_TABLE]), 400)
+        self.assertEqual(status_queue.status_queue_stats(statuses)["posted"], 400)
+        self.assertGreaterEqual(status_queue.status_queue_stats(statuses)["commits"], 4)
+        self.assertLess(status_queue.status_queue_stats(statuses)["commits"], 400)
+
+    def test_writer_synchronous(self):
+        """
+        test that groups are committed with synchronous=FULL and the writer's connection is
+        returned to the pool with the profile's setting
+        """
+        synchronous = []
+        original = main.add_status_batch
+
+        def add_status_batch(*args):
+            synchronous.append(main.db.query("PRAGMA synchronous").fetchone()[0])
+            return original(*args)
+
+        with patch('main.add_status_batch', add_status_batch):
+            statuses = status_queue.create_status_queue()
+            self.assertTrue(status_queue.post_status(statuses, "s1", "u1", "one").result(timeout=5))
+            status_queue.close_status_queue(statuses)
+        self.assertEqual(synchronous, [2])
+
+        reports = []
+        thread = threading.Thread(
+            target=lambda: reports.append(socialnetwork_model.pragma_report(self.database))
+        )
+        thread.start()
+        thread.join()
+        self.assertEqual(reports[0]["synchronous"], 1)
+
+    def test_close_commits_pending(self):
+        """
+        test that closing the queue commits what is still queued
+        """
+        statuses = status_queue.create_status_queue(flush_interval=10)
+        future = status_queue.post_status(statuses, "s1", "u1", "one")
+        status_queue.close_status_queue(statuses)
+        self.assertTrue(future.done())
+        self.assertTrue(future.result())
+
+
+if __name__ == "__main__":
+    unittest.main()
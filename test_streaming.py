@@ -0,0 +1,104 @@
+"""
+Unittests for streaming.py
+"""
+
+import os
+import unittest
+from unittest.mock import patch
+from playhouse.dataset import DataSet
+import main
+import streaming
+from csv_fixtures import write_csv
+
+
+class TestStreamStatusUpdates(unittest.TestCase):
+    """Unit tests for the resumable streaming status loader."""
+
+    def setUp(self):
+        """Set up an in-memory database and a status file."""
+        self.db = DataSet("sqlite:///:memory:")
+        main.db = self.db
+        self.filename = write_csv(
+            "STATUS_ID,USER_ID,STATUS_TEXT\n"
+            "s1,u1,one\n"
+            "s2,u1,\"two, with comma\"\n"
+            "s1,u1,duplicate\n"
+            "s3,u2,\n"
+            "s4,u2,four\n"
+        )
+        for user_id in ["u1", "u2"]:
+            self.db[main.USER_TABLE].insert(user_id=user_id, user_email="", user_name="",
+                                            user_last_name="")
+
+    def tearDown(self):
+        """Remove the CSV file and close the database."""
+        os.remove(self.filename)
+        self.db.close()
+
+    @patch('builtins.print')
+    def test_stream_status_updates(self, mock_print):
+        """Test loading a whole file in batches."""
+        summary = streaming.stream_status_updates(self.filename, batch_size=2)
+
+        self.assertEqual(summary, {
+            "loaded": 3, "duplicates": 1, "orphans": 0, "batches": 3, "rows": 5,
+        })
+        self.assertEqual(len(self.db[main.STATUS_TABLE]), 3)
+        self.assertEqual(streaming.get_checkpoint(self.filename), (0, 0))
+        mock_print.assert_called_once_with(
+            "Failed to add status due to duplicate status_id: "
+            "{'status_id': 's1', 'user_id': 'u1', 'status_text': 'duplicate'}"
+        )
+
+    @patch('builtins.print')
+    def test_stream_status_updates_resume(self, mock_print):
+        """Test that an interrupted load resumes from its checkpoint."""
+        real_insert_batch = main.insert_batch
+        calls = []
+
+        def crash_on_second_batch(table, rows):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise RuntimeError("crash")
+            return real_insert_batch(table, rows)
+
+        with patch('main.insert_batch', side_effect=crash_on_second_batch):
+            with self.assertRaises(RuntimeError):
+                streaming.stream_status_updates(self.filename, batch_size=2)
+
+        self.assertEqual(len(self.db[main.STATUS_TABLE]), 2)
+        self.assertEqual(streaming.get_checkpoint(self.filename)[1], 2)
+
+        summary = streaming.stream_status_updates(self.filename, batch_size=2)
+        self.assertEqual(summary, {
+            "loaded": 1, "duplicates": 1, "orphans": 0, "batches": 2, "rows": 5,
+        })
+        self.assertEqual(len(self.db[main.STATUS_TABLE]), 3)
+        mock_print.assert_any_call(f"Resuming {self.filename} after row 2")
+
+    @patch('builtins.print')
+    def test_checkpoint_of_replaced_file(self, mock_print):
+        """Test that a checkpoint is ignored once the file is replaced under the same name."""
+        streaming.save_checkpoint(self.filename, 20, 2)
+        self.assertEqual(streaming.get_checkpoint(self.filename), (20, 2))
+
+        with open(self.filename, "a", encoding="utf-8") as csvfile:
+            csvfile.write("s5,u2,five\n")
+        self.assertEqual(streaming.get_checkpoint(self.filename), (0, 0))
+        mock_print.assert_called_once_with(
+            f"Ignoring the checkpoint of {self.filename}: the file has changed since"
+        )
+
+        summary = streaming.stream_status_updates(self.filename)
+        self.assertEqual(summary["rows"], 6)
+        self.assertEqual(summary["loaded"], 4)
+
+    @patch('builtins.print')
+    def test_stream_status_updates_file_not_found(self, mock_print):
+        """Test that a missing file returns False."""
+        self.assertFalse(streaming.stream_status_updates("nonexistent.csv"))
+        mock_print.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
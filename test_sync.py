@@ -0,0 +1,125 @@
+"""
+Unittests for sync.py
+"""
+
+import os
+import unittest
+from unittest.mock import patch
+from playhouse.dataset import DataSet
+import loaders
+import main
+import sync
+from csv_fixtures import write_csv
+
+
+def sync_counts(added=0, changed=0, unchanged=0, rejected=0, removed=0):
+    """
+    return a sync summary with the given counts
+    """
+    return {"added": added, "changed": changed, "unchanged": unchanged, "rejected": rejected,
+            "removed": removed}
+
+
+class TestSyncUsers(unittest.TestCase):
+    """Unit tests for the fingerprint-based delta sync of the user file."""
+
+    def setUp(self):
+        """Set up an in-memory database synced with three users."""
+        self.db = DataSet("sqlite:///:memory:")
+        main.db = self.db
+        self.files = [write_csv(
+            "USER_ID,NAME,LASTNAME,EMAIL\n"
+            "u1,Ann,Lee,ann@uw.edu\n"
+            "u2,Bob,Ray,bob@uw.edu\n"
+            "u3,Cat,Day,cat@uw.edu\n"
+        )]
+        self.first = sync.sync_users(self.files[0])
+        self.db[main.STATUS_TABLE].insert(status_id="s3", user_id="u3", status_text="bye")
+
+    def tearDown(self):
+        """Remove the CSV files and close the database."""
+        for filename in self.files:
+            os.remove(filename)
+        self.db.close()
+
+    def test_first_sync(self):
+        """Test that the first sync adds every user."""
+        self.assertEqual(self.first, sync_counts(added=3))
+        self.assertEqual(len(self.db[main.USER_TABLE]), 3)
+        self.assertEqual(len(self.db[main.FINGERPRINT_TABLE]), 3)
+
+    def test_delta_sync(self):
+        """Test that only added, changed and removed users are written."""
+        self.files.append(write_csv(
+            "USER_ID,NAME,LASTNAME,EMAIL\n"
+            "u1,Ann,Lee,ann@uw.edu\n"
+            "u2,Bob,Ray,robert@uw.edu\n"
+            "u4,Dan,Fox,dan@uw.edu\n"
+        ))
+        with patch('loaders.write_upserts', wraps=loaders.write_upserts) as mock_write:
+            summary = sync.sync_users(self.files[-1], batch_size=2)
+
+        self.assertEqual(summary, sync_counts(added=1, changed=1, unchanged=1, removed=1))
+        written = [row["user_id"] for call in mock_write.call_args_list
+                   if call.args[0] is self.db[main.USER_TABLE].model_class for row in call.args[1]]
+        self.assertEqual(sorted(written), ["u2", "u4"])
+        users = self.db[main.USER_TABLE]
+        self.assertEqual(sorted(user["user_id"] for user in users.all()), ["u1", "u2", "u4"])
+        self.assertEqual(users.find_one(user_id="u2")["user_email"], "robert@uw.edu")
+        self.assertIsNone(self.db[main.STATUS_TABLE].find_one(user_id="u3"))
+        self.assertIsNone(self.db[main.FINGERPRINT_TABLE].find_one(user_id="u3"))
+
+    def test_sync_unchanged(self):
+        """Test that syncing the same file again writes nothing."""
+        summary = sync.sync_users(self.files[0])
+        self.assertEqual(summary, sync_counts(unchanged=3))
+
+    @patch('builtins.print')
+    def test_sync_file_not_found(self, mock_print):
+        """Test that a missing file returns False."""
+        self.assertFalse(sync.sync_users("nonexistent.csv"))
+        mock_print.assert_called_once()
+
+    def test_sync_repeated_user(self):
+        """Test that a user_id repeated in the file is counted once, with its last row."""
+        self.files.append(write_csv(
+            "USER_ID,NAME,LASTNAME,EMAIL\n"
+            "u1,Ann,Lee,ann@uw.edu\n"
+            "u2,Bob,Ray,bob@uw.edu\n"
+            "u3,Cat,Day,old@uw.edu\n"
+            "u3,Cat,Day,cat@uw.edu\n"
+        ))
+        summary = sync.sync_users(self.files[-1])
+        self.assertEqual(summary, sync_counts(unchanged=3))
+
+    @patch('builtins.print')
+    def test_sync_invalid_rows_kept(self, mock_print):
+        """Test that users in invalid rows are rejected, not removed or changed."""
+        self.files.append(write_csv(
+            "USER_ID,NAME,LASTNAME,EMAIL\n"
+            "u1,Ann,Lee,ann@uw.edu\n"
+            "u2,,Ray,bob@uw.edu\n"
+            "u3,Cat,Day,not-an-email\n"
+        ))
+        summary = sync.sync_users(self.files[-1])
+
+        self.assertEqual(summary, sync_counts(unchanged=1, rejected=2))
+        mock_print.assert_called_once_with(
+            "Rejected 2 invalid users: {'invalid_user_email': 1, 'missing_user_name': 1}"
+        )
+        self.assertEqual(self.db[main.USER_TABLE].find_one(user_id="u2")["user_name"], "Bob")
+        self.assertIsNotNone(self.db[main.STATUS_TABLE].find_one(user_id="u3"))
+
+    @patch('builtins.print')
+    def test_sync_removes_nothing_without_users(self, mock_print):
+        """Test that an empty file, a header-only file or a bad header removes nothing."""
+        for content in ["", "USER_ID,NAME,LASTNAME,EMAIL\n", "USER_ID,NAME\nu1,Ann\n"]:
+            self.files.append(write_csv(content))
+            self.assertFalse(sync.sync_users(self.files[-1]))
+        self.assertEqual(mock_print.call_count, 3)
+        self.assertEqual(len(self.db[main.USER_TABLE]), 3)
+        self.assertEqual(len(self.db[main.FINGERPRINT_TABLE]), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
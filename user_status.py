@@ -2,14 +2,16 @@
 classes to manage the user status messages
 '''
 # pylint: disable=R0903, E0401, C0103
-from peewee import IntegrityError
+from peewee import SQL, IntegrityError, fn
+from rejections import reject
 
 STATUS_TABLE = "StatusModel"
 USER_TABLE = "UserModel"
 
-def add_status(db):
+def add_status(db, report = None):
     """
-    Adds a status into the database
+    Adds a status into the database.
+    Duplicates are written to report (see rejections.py) if one is given, else printed.
     """
     def insert(**kwargs):
         try:
@@ -17,7 +19,7 @@ def add_status(db):
                 db[STATUS_TABLE].insert(**kwargs)
             return True
         except IntegrityError:
-            print("Duplicate status tried to be added")
+            reject(report, "duplicate_status_id", kwargs, "Duplicate status tried to be added")
             return False
     return insert
 
@@ -68,24 +70,25 @@ def load_status_updates(db):
             return False
     return load
 
-def delete_status_without_user(db):
+def delete_status_without_user(db, batch_size = 10000):
     """
-    Delete statuses without a user in the database
+    Delete statuses without a user in the database, batch_size statuses per transaction.
+    Orphans are found with an anti-join inside the database, so memory use does not
+    depend on the size of the tables. Returns the number of statuses deleted.
     """
-    # get all statuses that do not have a user id
-    user_table = db[USER_TABLE]
-    status_table = db[STATUS_TABLE]
-    user_query = user_table.find()
-    status_query = status_table.find()
-
-    status_user_id_set = set()
-    for status in status_query:
-        status_user_id_set.add(status["user_id"])
-    user_id_set = set()
-    for user in user_query:
-        user_id_set.add(user["user_id"])
-
-    difference = list(status_user_id_set.difference(user_id_set))
-    with db.transaction():
-        for diff in difference:
-            status_table.delete(user_id = diff)
\ No newline at end of file
+    status_model = db[STATUS_TABLE].model_class
+    user_model = db[USER_TABLE].model_class
+    # statuses with no matching user_id in the user table
+    orphans = (status_model
+               .select(status_model.id)
+               .where(~fn.EXISTS(user_model
+                                 .select(SQL("1"))
+                                 .where(user_model.user_id == status_model.user_id)))
+               .limit(batch_size))
+    deleted = 0
+    while True:
+        with db.transaction():
+            count = status_model.delete().where(status_model.id.in_(orphans)).execute()
+        deleted += count
+        if count < batch_size:
+            return deleted
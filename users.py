@@ -3,12 +3,14 @@ Functions for user information for the social network project
 """
 
 from peewee import IntegrityError
+from rejections import reject
 
 USER_TABLE = "UserModel"
 
-def add_user(db):
+def add_user(db, report=None):
     """
-    Adds a user to the database
+    Adds a user to the database.
+    Duplicates are written to report (see rejections.py) if one is given, else printed.
     """
     def insert(**kwargs):
         try:
@@ -16,7 +18,7 @@ def add_user(db):
                 db[USER_TABLE].insert(**kwargs)
             return True
         except IntegrityError:
-            print("Duplicate ID tried to be added")
+            reject(report, "duplicate_user_id", kwargs, "Duplicate ID tried to be added")
             return False
     return insert
 